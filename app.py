@@ -1,204 +1,187 @@
-from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit
-from poker.game import PokerGame
+import atexit
+import logging
+import os
+import threading
+
+from flask import Flask, Response, render_template, request
+from flask_socketio import SocketIO
+from poker.broadcast import broadcast_ticks
+from poker.history import HandHistoryWriter
+from poker.lobby import Lobby
+from poker.metrics import CONTENT_TYPE, EVENT_HELP, EVENT_SECONDS, metrics, register_lobby, timed
+from poker.snapshot import SnapshotStore
+from poker.turn_clock import TurnClock
+
+# LOG_LEVEL=DEBUG shows every deal, action and award; they are skipped without formatting otherwise
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format="%(message)s")
+log = logging.getLogger(__name__)
 
 app = Flask(__name__)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-games = {}
-waiting_players = {}  # ✅ Track players waiting for the next game
-player_sessions = {}  # ✅ Map player names to their session IDs
+# Set HAND_HISTORY_DIR to record every hand played to a binary hand-history log
+history = HandHistoryWriter(os.environ["HAND_HISTORY_DIR"]) if os.environ.get("HAND_HISTORY_DIR") else None
+if history:
+    atexit.register(history.close)
 
+lobby = Lobby(history=history)
+register_lobby(lobby)
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+# Players get TURN_TIMEOUT seconds to act before they are checked or folded; 0 turns the clock off
+turn_timeout = float(os.environ.get("TURN_TIMEOUT", 30))
+if turn_timeout:
+    lobby.clock = TurnClock(turn_timeout)
 
-@socketio.on('connect')
-def handle_connect():
-    emit('update_games', list(games.keys()))
+# Table updates go out once per BROADCAST_TICK seconds (0 sends them after every event) and to
+# spectators once per SPECTATOR_INTERVAL seconds
+broadcast_tick = float(os.environ.get("BROADCAST_TICK", 0.05))
+spectator_interval = float(os.environ.get("SPECTATOR_INTERVAL", 0.5))
 
-@socketio.on('create_game')
-def handle_create_game():
-    game_id = f"game-{len(games) + 1}"
-    games[game_id] = PokerGame()
-    emit('update_games', list(games.keys()), broadcast=True)
+# Set SNAPSHOT_PATH to keep every table across restarts; changes are saved every SNAPSHOT_INTERVAL seconds
+snapshots = SnapshotStore(os.environ["SNAPSHOT_PATH"]) if os.environ.get("SNAPSHOT_PATH") else None
+if snapshots:
+    log.info("💾 Restored %s tables from %s", snapshots.restore(lobby), snapshots.path)
 
+games = lobby.games
+waiting_players = lobby.waiting_players  # ✅ Track players waiting for the next game
+sessions = lobby.sessions  # ✅ sid <-> player name <-> game indexes
+sent_hands = lobby.sent_hands  # ✅ Map session IDs to the hole cards last sent to them
 
+# Handler threads and the background tasks all share the Lobby; each call and its emits run under this lock
+lobby_lock = threading.Lock()
 
 
-@socketio.on('join_game')
-def handle_join_game(data):
-    game_id = data['game_id']
-    player_name = data['name']
+def send(operations):
+    """Carry out the socket operations returned by a Lobby handler, in order."""
+    for operation in operations:
+        if operation[0] == "emit":
+            _, event, data, to = operation
+            socketio.emit(event, data, to=to)
+        elif operation[0] == "enter_room":
+            socketio.server.enter_room(operation[1], operation[2], namespace="/")
+        elif operation[0] == "leave_room":
+            socketio.server.leave_room(operation[1], operation[2], namespace="/")
+
 
-    if game_id in games:
-        game = games[game_id]
+def handle(handler, *args):
+    """Call a Lobby handler and carry out its operations while holding lobby_lock."""
+    with lobby_lock:
+        send(handler(*args))
 
-        if game.current_round > 0:
-            if game_id not in waiting_players:
-                waiting_players[game_id] = []
-            waiting_players[game_id].append(player_name)
-            emit('join_error', {"message": "Game in progress! You'll be added to the next round."}, room=request.sid)
-            return
 
-        game.add_player(player_name)
-        player_sessions[player_name] = request.sid  # ✅ Store player's session ID
-        player = game.get_player(player_name)
+def handler_timed(event):
+    """Record how long a Socket.IO handler takes, its emits included, under its event name."""
+    return timed(EVENT_SECONDS, EVENT_HELP, event=event)
 
-        # ✅ Ensure player gets hole cards
-        if player and not player.hand:
-            player.hand = game.deck.deal(2)  # 🎴 Give two hole cards
 
-        print(f"🃏 {player_name} joined and received: {player.hand}")
+@app.route('/')
+def index():
+    return render_template('index.html')
 
-        # ✅ Now emit game state and player's hand properly
-        emit('game_state', game.get_state())
-        emit('player_hand', {"hand": player.hand}, room=request.sid)
+@app.route('/metrics')
+def metrics_page():
+    """Handler timings and lobby gauges in Prometheus text format."""
+    with lobby_lock:
+        page = metrics.render()
+    return Response(page, content_type=CONTENT_TYPE)
 
+@socketio.on('connect')
+@handler_timed('connect')
+def handle_connect(auth=None):  # pylint: disable=unused-argument
+    handle(lobby.connect, request.sid)
 
+@socketio.on('create_game')
+@handler_timed('create_game')
+def handle_create_game():
+    handle(lobby.create_game, request.sid)
 
+@socketio.on('join_game')
+@handler_timed('join_game')
+def handle_join_game(data):
+    handle(lobby.join_game, request.sid, data)
 
+@socketio.on('watch_game')
+@handler_timed('watch_game')
+def handle_watch_game(data):
+    handle(lobby.watch_game, request.sid, data)
 
+@socketio.on('request_state')
+@handler_timed('request_state')
+def handle_request_state(data):
+    """Full resync for a client that missed a state patch version."""
+    handle(lobby.request_state, request.sid, data)
 
 @socketio.on('player_action')
+@handler_timed('player_action')
 def handle_action(data):
-    print(f"⚡ Flask received action: {data}")
-
-    game_id = data['game_id']
-    if game_id in games:
-        game = games[game_id]
-        print("✅ Game found, processing action...")
-
-        game.process_action(data['name'], data.get('action', ""), data.get('amount', 0))
-
-        active_players = [p for p in game.players if p.status != "folded"]
-
-        # 🏆 **Check if only one player remains (Win by fold)**
-        if len(active_players) == 1:
-            winner_data = {"winner": active_players[0].name, "pot": game.pot}
-            socketio.emit("game_result", winner_data)  # ✅ Show winner pop-up
-            print(f"🎉 Winner announced due to fold: {winner_data}")
-
-            socketio.emit("start_new_game")  # ✅ Restart game after fold
-            return  # ✅ Prevent further action processing
-
-        # 🏆 **Check if round reached showdown (Normal game end)**
-        if game.rounds[game.current_round] == "showdown":
-            winner_data = {"winner": game.determine_winner(), "pot": game.pot}
-            socketio.emit("game_result", winner_data)  # ✅ Show winner pop-up
-            print(f"🎉 Winner announced at showdown: {winner_data}")
-
-            socketio.emit("start_new_game")  # ✅ Restart game after showdown
-            return  # ✅ Prevent further action processing
-
-        # 🔄 **Ensure UI refreshes properly during normal play**
-        socketio.emit("game_state", game.get_state())
-
-
-
-
+    handle(lobby.player_action, request.sid, data)
 
 @socketio.on('start_new_game')
-def start_new_game():
-    global games, waiting_players
-
-    if not games:  # ✅ Prevent calling max() on empty dict
-        print("❌ No active games, skipping new game start.")
-        return
-
-    game_id = max(games.keys(), key=lambda x: int(x.split("-")[-1]))  # Keep latest game
-    game = games[game_id]
-
-    game.start_game()  # 🔄 Reset the game state
-
-    # ✅ Add waiting players from queue
-    if game_id in waiting_players:
-        for player_name in waiting_players[game_id]:
-            game.add_player(player_name)
-            print(f"✅ Queued player {player_name} added to new game.")
-
-        waiting_players[game_id] = []  # ✅ Clear queue after players are added
-
-    socketio.emit("game_state", game.get_state())  # ✅ Broadcast fresh game state
-    print("♻️ New round started with queued + existing players!")
-
-
-
-
-
+@handler_timed('start_new_game')
+def start_new_game(data=None):
+    handle(lobby.start_new_game, request.sid, data)
 
 @socketio.on('leave_game')
+@handler_timed('leave_game')
 def handle_leave(data):
-    game_id = data['game_id']
-    player_name = data['name']
-
-    if game_id in games:
-        game = games[game_id]
-        game.players = [p for p in game.players if p.name != player_name]
-
-        # ✅ If no players remain, delete the game and notify clients
-        if not game.players:
-            del games[game_id]
-            print(f"♻️ Game {game_id} removed since no players remain.")
-            socketio.emit("game_deleted", {"game_id": game_id})  # ✅ Notify UI to remove game
-        else:
-            socketio.emit("game_state", game.get_state())  # ✅ Only emit if game still exists
-    else:
-        print(f"⚠️ Attempted to leave non-existent game {game_id}.")
+    handle(lobby.leave_game, request.sid, data)
 
+@socketio.on('disconnect')
+@handler_timed('disconnect')
+def handle_disconnect(reason=None):  # pylint: disable=unused-argument
+    handle(lobby.disconnect, request.sid)
 
 
-@socketio.on('disconnect')
-def handle_disconnect():
-    player_sid = request.sid
-    disconnected_player = None
-    game_id = None
+@handler_timed('turn_expired')
+def expire_turn(game_id, token):
+    handle(lobby.turn_expired, game_id, token)
 
-    # ✅ Find the player by their session ID
-    for name, sid in player_sessions.items():
-        if sid == player_sid:
-            disconnected_player = name
-            break
 
-    if not disconnected_player:
-        print(f"❌ Unknown session disconnected: {player_sid}")
-        return
+def run_turn_clock():
+    """Check or fold, in one background task, every player whose turn clock ran out."""
+    while True:
+        socketio.sleep(lobby.clock.wait())
+        for game_id, token in lobby.clock.expired():
+            try:
+                expire_turn(game_id, token)
+            except Exception:  # pylint: disable=broad-exception-caught
+                log.exception("❌ Turn clock failed to act at %s", game_id)  # Keep the clock running for the rest
 
-    # ✅ Remove from active sessions
-    del player_sessions[disconnected_player]
 
-    # ✅ Find their game and remove them
-    for gid, game in games.items():
-        if any(p.name == disconnected_player for p in game.players):
-            game_id = gid
-            break
+@handler_timed('broadcast_tick')
+def broadcast(spectators):
+    handle(lobby.flush, spectators)
 
-    if game_id:
-        game = games[game_id]
-        game.players = [p for p in game.players if p.name != disconnected_player]
-        print(f"❌ {disconnected_player} disconnected and removed from {game_id}")
 
-        # ✅ If the disconnected player was up next, advance turn
-        if game.get_current_player() and game.get_current_player().name == disconnected_player:
-            game.next_turn()
+def run_broadcasts():
+    """Send each tick's coalesced table updates, and the spectators' when they are due."""
+    for delay, spectators in broadcast_ticks(broadcast_tick, spectator_interval):
+        socketio.sleep(delay)
+        try:
+            broadcast(spectators)
+        except Exception:  # pylint: disable=broad-exception-caught
+            log.exception("❌ Broadcast tick failed")  # The next tick still runs
 
-        # ✅ If only one player remains, declare winner
-        active_players = [p for p in game.players if p.status != "folded"]
-        if len(active_players) == 1:
-            winner = active_players[0]
-            winner.award_winnings(game.pot)
-            socketio.emit("game_result", {"winner": winner.name, "pot": game.pot})
-            del games[game_id]
 
-        socketio.emit("game_state", game.get_state())
+def snapshot_periodically(interval):
+    while True:
+        socketio.sleep(interval)
+        with lobby_lock:
+            snapshots.write(lobby)
 
 
+def start_background_tasks():
+    """Start the broadcast, turn clock and snapshot tasks; call once before socketio.run."""
+    if broadcast_tick:
+        lobby.dirty = set()
+    socketio.start_background_task(run_broadcasts)
+    if lobby.clock:
+        socketio.start_background_task(run_turn_clock)
+    if snapshots:
+        atexit.register(snapshots.close, lobby)
+        socketio.start_background_task(snapshot_periodically, float(os.environ.get("SNAPSHOT_INTERVAL", 5)))
 
 
 if __name__ == '__main__':
+    start_background_tasks()
     socketio.run(app, debug=True)
-
-
-
-
@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+import uvicorn
+
+from poker.broadcast import broadcast_ticks
+from poker.history import HandHistoryWriter
+from poker.lobby import Lobby
+from poker.message_queue import HubManager, run_hub
+from poker.metrics import CONTENT_TYPE, EVENT_HELP, EVENT_SECONDS, metrics, register_lobby
+from poker.sharding import Shard
+from poker.snapshot import SnapshotStore
+from poker.turn_clock import TurnClock
+
+log = logging.getLogger(__name__)
+EVENTS = ("create_game", "join_game", "watch_game", "request_state", "player_action", "start_new_game", "leave_game")
+
+
+def create_server(lobby, client_manager=None, snapshots=None, snapshot_interval=5.0, turn_timeout=30.0,
+                  broadcast_tick=0.05, spectator_interval=0.5):
+    """Wire a Lobby to a python-socketio AsyncServer; returns (sio, asgi_app).
+
+    Game logic (including showdown evaluation and all-in equity) runs on one
+    engine thread: the event loop only moves bytes, and events are applied to
+    the tables in the order they arrived, exactly as a single process would.
+    With a SnapshotStore (already restored into lobby), changed tables are
+    written every snapshot_interval seconds, also on the engine thread so a
+    snapshot never sees a half-applied event. The app's before_shutdown then
+    takes the last snapshot; serve calls it before connections are dropped,
+    so players are not saved as having disconnected. GET /metrics returns
+    per-event timings and the lobby gauges in Prometheus text format.
+    With a turn_timeout, one task checks or folds players who run out of
+    time, through the engine thread like any other event. With a
+    broadcast_tick, table updates are coalesced and flushed once per tick;
+    spectators are updated every spectator_interval seconds either way.
+    """
+    sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*", client_manager=client_manager)
+    engine = ThreadPoolExecutor(max_workers=1, thread_name_prefix="poker-engine")
+    send_lock = asyncio.Lock()
+    if turn_timeout:
+        lobby.clock = TurnClock(turn_timeout)
+    if broadcast_tick:
+        lobby.dirty = set()
+    register_lobby(lobby)
+    timings = {event: metrics.histogram(EVENT_SECONDS, EVENT_HELP, event=event)
+               for event in ("connect",) + EVENTS + ("disconnect", "lobby_message", "turn_expired", "broadcast_tick")}
+
+    async def dispatch(event, handler, *args, ignore_queue=False):
+        """Run a Lobby handler on the engine thread, then perform its socket operations.
+
+        Handlers finish in arrival order and resume here in the same order, so
+        the send lock keeps one event's messages from interleaving with the next's.
+        With ignore_queue, emits reach only this worker's clients. The time
+        from arrival to the last message sent is recorded under event.
+        """
+        start = time.perf_counter()
+        operations = await asyncio.get_running_loop().run_in_executor(engine, handler, *args)
+        async with send_lock:
+            for operation in operations:
+                if operation[0] == "emit":
+                    _, name, data, to = operation
+                    await sio.emit(name, data, to=to, ignore_queue=ignore_queue)
+                elif operation[0] == "enter_room":
+                    await sio.enter_room(operation[1], operation[2])
+                elif operation[0] == "leave_room":
+                    await sio.leave_room(operation[1], operation[2])
+                else:
+                    await sio.manager.publish_lobby(operation[1])
+        timings[event].observe(time.perf_counter() - start)
+
+    def on(event):
+        handler = getattr(lobby, event)
+
+        async def handle(sid, *args):
+            await dispatch(event, handler, sid, *args)
+        sio.on(event, handle)
+
+    for event in EVENTS:
+        on(event)
+
+    @sio.event
+    async def connect(sid, _environ):
+        await dispatch("connect", lobby.connect, sid)
+
+    @sio.event
+    async def disconnect(sid, *_):
+        await dispatch("disconnect", lobby.disconnect, sid)
+
+    if isinstance(client_manager, HubManager):
+        async def on_lobby(message):
+            await dispatch("lobby_message", lobby.lobby_message, message, ignore_queue=True)
+        client_manager.on_lobby = on_lobby
+
+    async def snapshot_periodically():
+        while True:
+            await asyncio.sleep(snapshot_interval)
+            await asyncio.get_running_loop().run_in_executor(engine, snapshots.write, lobby)
+
+    async def run_turn_clock():
+        while True:
+            await asyncio.sleep(lobby.clock.wait())
+            for game_id, token in lobby.clock.expired():
+                try:
+                    await dispatch("turn_expired", lobby.turn_expired, game_id, token)
+                except Exception:  # pylint: disable=broad-exception-caught
+                    log.exception("❌ Turn clock failed to act at %s", game_id)  # Keep the clock running for the rest
+
+    async def run_broadcasts():
+        for delay, spectators in broadcast_ticks(broadcast_tick, spectator_interval):
+            await asyncio.sleep(delay)
+            try:
+                await dispatch("broadcast_tick", lobby.flush, spectators)
+            except Exception:  # pylint: disable=broad-exception-caught
+                log.exception("❌ Broadcast tick failed")  # The next tick still runs
+
+    async def on_startup():
+        sio.start_background_task(run_broadcasts)
+        if snapshots:
+            sio.start_background_task(snapshot_periodically)
+        if lobby.clock:
+            sio.start_background_task(run_turn_clock)
+
+    async def before_shutdown():
+        await asyncio.get_running_loop().run_in_executor(engine, snapshots.close, lobby)
+
+    async def metrics_page(scope, _receive, send):
+        if scope["type"] != "http" or scope["path"] != "/metrics":
+            await send({"type": "http.response.start", "status": 404, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        # Rendered on the engine thread, which is the only one changing the lobby
+        body = (await asyncio.get_running_loop().run_in_executor(engine, metrics.render)).encode("utf-8")
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", CONTENT_TYPE.encode("ascii"))]})
+        await send({"type": "http.response.body", "body": body})
+
+    app = socketio.ASGIApp(sio, metrics_page, static_files={"/": "templates/index.html", "/static": "static"},
+                           on_startup=on_startup)
+    app.before_shutdown = before_shutdown if snapshots else None
+    return sio, app
+
+
+def create_app():
+    """A single-worker app with an empty lobby, built on demand: uvicorn --factory asgi:create_app."""
+    return create_server(Lobby())[1]
+
+
+class _Server(uvicorn.Server):
+    """uvicorn server that runs the app's before_shutdown before closing any connection."""
+
+    async def shutdown(self, sockets=None):
+        if self.config.app.before_shutdown:
+            await self.config.app.before_shutdown()
+        await super().shutdown(sockets)
+
+
+def serve(lobby_app, host, port, history=None):
+    try:
+        _Server(uvicorn.Config(lobby_app, host=host, port=port, log_level="warning", backlog=8192)).run()
+    except KeyboardInterrupt:
+        pass  # Re-raised by uvicorn after a clean shutdown, as uvicorn.run also swallows it
+    finally:
+        if history:
+            history.close()  # Write out hands still in progress
+
+
+def serve_shard(index, urls, host, port, hub_address, history_dir=None, timing=(30.0, 0.05, 0.5)):
+    """Run one worker of a sharded deployment (a multiprocessing target).
+
+    timing is (turn timeout, broadcast tick, spectator interval), as for create_server.
+    """
+    history = HandHistoryWriter(history_dir, f"shard{index}-") if history_dir else None
+    turn_timeout, broadcast_tick, spectator_interval = timing
+    _, shard_app = create_server(Lobby(Shard(index, urls), history), HubManager(*hub_address),
+                                 turn_timeout=turn_timeout, broadcast_tick=broadcast_tick,
+                                 spectator_interval=spectator_interval)
+    serve(shard_app, host, port, history)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the poker app as an ASGI application with uvicorn.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--shards", type=int, default=1,
+                        help="worker processes; tables are split between them by game id hash")
+    parser.add_argument("--hub-port", type=int, default=5555, help="port of the local message queue (sharded mode)")
+    parser.add_argument("--public-url", default="http://{host}:{port}",
+                        help="how clients reach a worker; {host} and {port} are filled in per worker")
+    parser.add_argument("--history-dir", help="record every hand played to a binary hand-history log here")
+    parser.add_argument("--snapshot", help="snapshot log of every table, restored on start (unsharded only)")
+    parser.add_argument("--snapshot-interval", type=float, default=5.0, help="seconds between snapshots")
+    parser.add_argument("--turn-timeout", type=float, default=30.0,
+                        help="seconds a player has to act before being checked or folded; 0 disables")
+    parser.add_argument("--broadcast-tick", type=float, default=0.05,
+                        help="seconds between coalesced table updates; 0 sends them after every event")
+    parser.add_argument("--spectator-interval", type=float, default=0.5, help="seconds between spectator updates")
+    parser.add_argument("--log-level", default="INFO",
+                        help="DEBUG shows every deal, action and award; they are skipped without formatting otherwise")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+
+    if args.shards == 1:
+        history = HandHistoryWriter(args.history_dir) if args.history_dir else None
+        lobby = Lobby(history=history)
+        snapshots = SnapshotStore(args.snapshot) if args.snapshot else None
+        if snapshots:
+            log.info("💾 Restored %s tables from %s", snapshots.restore(lobby), args.snapshot)
+        serve(create_server(lobby, snapshots=snapshots, snapshot_interval=args.snapshot_interval,
+                            turn_timeout=args.turn_timeout, broadcast_tick=args.broadcast_tick,
+                            spectator_interval=args.spectator_interval)[1], args.host, args.port, history)
+        return
+
+    # Worker i listens on port + i; the lobby works from any of them
+    ports = [args.port + index for index in range(args.shards)]
+    urls = [args.public_url.format(host=args.host, port=port) for port in ports]
+    hub = multiprocessing.Process(target=run_hub, args=(args.host, args.hub_port), daemon=True)
+    hub.start()
+    workers = [
+        multiprocessing.Process(target=serve_shard,
+                                args=(index, urls, args.host, port, (args.host, args.hub_port), args.history_dir,
+                                      (args.turn_timeout, args.broadcast_tick, args.spectator_interval)))
+        for index, port in enumerate(ports)
+    ]
+    for worker in workers:
+        worker.start()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # Run the cleanup below when terminated
+    log.info("🔀 %s shards at %s", args.shards, ", ".join(urls))
+    try:
+        for worker in workers:
+            worker.join()
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.join()
+        hub.terminate()
+
+
+if __name__ == "__main__":
+    main()
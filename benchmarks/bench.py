@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from poker.deck import Deck, serialize_cards
+from poker.game import PokerGame
+from poker.hand_evaluator import evaluate_hand, evaluate_ints, evaluate_many
+from poker.lobby import Lobby
+from poker.player import ALL_IN
+
+SEED = 1234
+
+
+def _stats(timings):
+    """Summarise per-operation timings (seconds) from several repeats."""
+    median = statistics.median(timings)
+    return {"median_s": median, "min_s": min(timings), "ops_per_sec": 1 / median if median else 0.0}
+
+
+def _measure(fn, number, repeat=5, batch=1):
+    """Time fn number times per repeat; batch is how many operations one fn call performs."""
+    return _stats([total / number / batch for total in timeit.repeat(fn, number=number, repeat=repeat)])
+
+
+def _measure_with_setup(setup, fn, number, repeat=5, batch=1):
+    """Like _measure, but only fn(setup()) is timed and setup runs before every call."""
+    timings = []
+    for _ in range(repeat):
+        elapsed = 0.0
+        for _ in range(number):
+            state = setup()
+            start = time.perf_counter()
+            fn(state)
+            elapsed += time.perf_counter() - start
+        timings.append(elapsed / number / batch)
+    return _stats(timings)
+
+
+def _new_game(rng, players=6):
+    game = PokerGame(rng=rng, compute_equity=False)
+    for seat in range(players):
+        game.add_player(f"p{seat}")
+    game.start_game()
+    return game
+
+
+def bench_evaluate_hand():
+    """Card-dict entry point, including the conversion to integers."""
+    rng = random.Random(SEED)
+    hands = [serialize_cards(Deck(rng).deal(7)) for _ in range(1000)]
+    return _measure(lambda: [evaluate_hand(hand) for hand in hands], number=5, batch=len(hands))
+
+
+def bench_evaluate_ints():
+    rng = random.Random(SEED)
+    hands = [Deck(rng).deal(7) for _ in range(1000)]
+    return _measure(lambda: [evaluate_ints(hand) for hand in hands], number=5, batch=len(hands))
+
+
+def bench_deal_hand():
+    """A fresh deck dealing six hole-card pairs and a full board."""
+    rng = random.Random(SEED)
+    return _measure(lambda: Deck(rng).deal(17), number=2000)
+
+
+def bench_evaluate_many():
+    rng = np.random.default_rng(SEED)
+    hands = rng.random((100000, 52)).argsort(axis=1)[:, :7]
+    return _measure(lambda: evaluate_many(hands), number=3, batch=len(hands))
+
+
+def bench_process_action():
+    """Latency of one call/check action while playing six-handed hands to showdown."""
+    rng = random.Random(SEED)
+    game = _new_game(rng)
+    timings = []
+    for _ in range(5):
+        elapsed, actions = 0.0, 0
+        for _ in range(200):
+            player = game.get_current_player()
+            start = time.perf_counter()
+            game.process_action(player.name, "call")
+            elapsed += time.perf_counter() - start
+            actions += 1
+            if game.rounds[game.current_round] == "showdown":
+                game.determine_winner()
+                game.start_game()
+        timings.append(elapsed / actions)
+    return _stats(timings)
+
+
+def bench_next_round():
+    rng = random.Random(SEED)
+    return _measure_with_setup(lambda: _new_game(rng), lambda game: game.next_round(), number=200)
+
+
+def bench_determine_winner_side_pots():
+    """Six players all-in for different amounts, giving five side pots."""
+    rng = random.Random(SEED)
+
+    def setup():
+        game = _new_game(rng)
+        for seat, player in enumerate(game.players):
+            player.chips = 0
+            player.bet_amount = 100 * (seat + 1)
+            player.status = ALL_IN
+        game.pot = sum(p.bet_amount for p in game.players)
+        game.community_cards = game.deck.deal(5)
+        game.current_round = len(game.rounds) - 1
+        return game
+
+    return _measure_with_setup(setup, lambda game: game.determine_winner(), number=200)
+
+
+def bench_get_state():
+    """get_state plus JSON encoding, i.e. the cost of one serialized snapshot."""
+    rng = random.Random(SEED)
+    game = _new_game(rng)
+    game.next_round()
+    return _measure(lambda: json.dumps(game.get_state()), number=2000)
+
+
+def bench_disconnect_storm():
+    """Per-disconnect cost when every player at 300 six-handed tables drops at once."""
+
+    def setup():
+        lobby = Lobby()
+        for table in range(300):
+            lobby.create_game(None)
+            game_id = next(reversed(lobby.games))
+            for seat in range(6):
+                lobby.join_game(f"sid-{table}-{seat}", {"game_id": game_id, "name": f"p{table}-{seat}"})
+        return lobby
+
+    def storm(lobby):
+        for table in range(300):
+            for seat in range(6):
+                lobby.disconnect(f"sid-{table}-{seat}")
+
+    return _measure_with_setup(setup, storm, number=1, repeat=3, batch=300 * 6)
+
+
+def bench_socket_round_trip():
+    """player_action through the Flask-SocketIO test client until game_state arrives."""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")  # app configures logging on import; keep INFO lines off stderr
+    import app as server  # pylint: disable=import-outside-toplevel
+
+    server.games.clear()
+    server.waiting_players.clear()
+    server.sessions.clear()
+    clients = {name: server.socketio.test_client(server.app) for name in ("alice", "bob")}
+    first = next(iter(clients.values()))
+    first.emit("create_game")
+    game_id = next(iter(server.games))
+    for name, client in clients.items():
+        client.emit("join_game", {"game_id": game_id, "name": name})
+    game = server.games[game_id]
+    game.rng = random.Random(SEED)
+    game.compute_equity = False
+    first.emit("start_new_game")
+
+    timings = []
+    for _ in range(5):
+        elapsed, actions = 0.0, 0
+        for _ in range(100):
+            name = game.get_current_player().name
+            start = time.perf_counter()
+            clients[name].emit("player_action", {"game_id": game_id, "name": name, "action": "call"})
+            clients[name].get_received()
+            elapsed += time.perf_counter() - start
+            actions += 1
+            if game.rounds[game.current_round] == "showdown":
+                first.emit("start_new_game")
+            for client in clients.values():
+                client.get_received()
+        timings.append(elapsed / actions)
+    for client in clients.values():
+        client.disconnect()
+    return _stats(timings)
+
+
+BENCHMARKS = {
+    "evaluate_hand": bench_evaluate_hand,
+    "evaluate_ints": bench_evaluate_ints,
+    "deal_hand": bench_deal_hand,
+    "evaluate_many": bench_evaluate_many,
+    "process_action": bench_process_action,
+    "next_round": bench_next_round,
+    "determine_winner_side_pots": bench_determine_winner_side_pots,
+    "get_state": bench_get_state,
+    "disconnect_storm": bench_disconnect_storm,
+    "socket_round_trip": bench_socket_round_trip,
+}
+
+
+def run(names):
+    results = {}
+    for name in names:
+        results[name] = BENCHMARKS[name]()
+        print(f"{name:30s} {results[name]['median_s'] * 1e6:12.2f} us/op", file=sys.stderr)
+    return {
+        "meta": {
+            "seed": SEED,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Return the benchmarks whose best time got slower than baseline by more than tolerance.
+
+    The fastest repeat is compared because it is the least disturbed by other
+    load on the machine.
+    """
+    regressions = []
+    for name, result in report["results"].items():
+        previous = baseline["results"].get(name)
+        if not previous:
+            continue
+        change = result["min_s"] / previous["min_s"] - 1
+        flag = "REGRESSION" if change > tolerance else "ok"
+        print(f"{name:30s} {change * 100:+8.1f}% vs baseline  {flag}", file=sys.stderr)
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the evaluator, game engine and socket layer.")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--output", help="write the JSON report to this file (default: stdout)")
+    parser.add_argument("--baseline", help="compare against a previously saved JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown vs baseline before failing (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    report = run(args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            regressions = compare(report, json.load(handle), args.tolerance)
+        if regressions:
+            sys.exit(f"Performance regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import aiohttp
+
+from benchmarks.soak import Seat, _connect, _raise_file_limit, _summary, call
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def mixed(rng):
+    """Mostly calls, sometimes a raise of two big blinds, now and then a fold."""
+    roll = rng.random()
+    if roll < 0.1:
+        return "fold", 0
+    if roll < 0.3:
+        return "raise", 40
+    return "call", 0
+
+
+def aggressive(rng):
+    return ("raise", rng.choice((40, 80, 200))) if rng.random() < 0.6 else ("call", 0)
+
+
+STRATEGIES = {"call": call, "mixed": mixed, "aggressive": aggressive}
+
+
+def _process_cpu(pid):
+    """CPU seconds used so far by a process and its waited-for children, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii") as handle:
+            fields = handle.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return sum(int(value) for value in fields[11:15]) / os.sysconf("SC_CLK_TCK")
+
+
+def _spawn(server, url):
+    """Start app.py (Flask-SocketIO, threaded) or asgi.py on url's port, logging only warnings."""
+    host, port = url.rsplit("//", 1)[-1].rsplit(":", 1)
+    if server == "app":
+        command = [sys.executable, "-c", "import app; app.start_background_tasks(); app.socketio.run(app.app, "
+                   "host=%r, port=%s, allow_unsafe_werkzeug=True)" % (host, port)]
+    else:
+        command = [sys.executable, "asgi.py", "--host", host, "--port", port, "--log-level", "WARNING"]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL,  # pylint: disable=consider-using-with
+                               env={**os.environ, "LOG_LEVEL": "WARNING"})
+    time.sleep(3)
+    return process
+
+
+async def _create_tables(url, session, tables):
+    """Create every table from one client, before the players connect, and return their ids.
+
+    app.py announces each new table to every connected client, so creating
+    them up front keeps that broadcast out of the measured fan-out.
+    """
+    created = asyncio.Queue()
+    client = await _connect(url, session, handlers={"update_games": created.put})
+    await created.get()  # The list sent on connect
+    game_ids = []
+    for _ in range(tables):
+        await client.emit("create_game")
+        game_ids.append((await asyncio.wait_for(created.get(), 30))[-1])
+    return client, game_ids
+
+
+def _spectator_counter(received, event):
+    async def count(*_):
+        received[f"spectator:{event}"] += 1
+    return count
+
+
+async def load(url, tables, players, strategies, duration, window, timeout, server_pid=None, seed=None,
+               spectators=0):
+    """Seat players * tables clients, play for duration seconds and report latency, fan-out and CPU.
+
+    With spectators, that many more clients per table watch it; their messages
+    are counted under "spectator:" events.
+    """
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    rng = random.Random(seed)
+    latencies, stalls, received = [], [], Counter()
+    creator, game_ids = await _create_tables(url, session, tables)
+
+    start = time.perf_counter()
+    gate = asyncio.Semaphore(50)
+
+    async def seat(index):
+        async with gate:
+            client = await _connect(url, session)
+        table, position = divmod(index, players)
+        name = f"load-{table}-{position}"
+        strategy = STRATEGIES[strategies[index % len(strategies)]]
+        player = Seat(client, game_ids[table], name, position == 0, latencies, stalls,
+                      strategy, random.Random(rng.random()), received)
+        await client.emit("join_game", {"game_id": game_ids[table], "name": name})
+        return player
+
+    async def spectate(index):
+        handlers = {event: _spectator_counter(received, event) for event in ("game_state", "game_state_patch")}
+        async with gate:
+            client = await _connect(url, session, handlers=handlers)
+        await client.emit("watch_game", {"game_id": game_ids[index % tables]})
+        return client
+
+    seats = await asyncio.gather(*(seat(index) for index in range(tables * players)))
+    watchers = await asyncio.gather(*(spectate(index) for index in range(tables * spectators)))
+    connect_time = time.perf_counter() - start
+    print(f"{len(seats)} players seated and {len(watchers)} spectators watching {tables} tables "
+          f"in {connect_time:.1f}s", file=sys.stderr)
+
+    for player in seats:
+        player.playing = True
+    watchdogs = [asyncio.create_task(player.watchdog(timeout)) for player in seats]
+    for player in seats:
+        if player.starter:
+            await player.client.emit("start_new_game", {"game_id": player.game_id})
+
+    received.clear()  # Count fan-out from play only, not from seating
+    all_latencies, windows = [], []
+    server_cpu_start = _process_cpu(server_pid) if server_pid else None
+    cpu_start = resource.getrusage(resource.RUSAGE_SELF)
+    actions_start = sum(player.actions for player in seats)
+    play_start = time.perf_counter()
+    end = play_start + duration
+    while time.perf_counter() < end:
+        await asyncio.sleep(window)
+        sample, latencies[:] = list(latencies), []
+        all_latencies.extend(sample)
+        windows.append({"stalls": len(stalls), **_summary(sample)})
+        print(f"window {len(windows)}: {json.dumps(windows[-1])}", file=sys.stderr)
+    elapsed = time.perf_counter() - play_start
+    cpu_end = resource.getrusage(resource.RUSAGE_SELF)
+    server_cpu_end = _process_cpu(server_pid) if server_pid else None
+    actions = sum(player.actions for player in seats) - actions_start
+    messages = dict(received)
+
+    for player in seats:
+        player.playing = False
+    for task in watchdogs:
+        task.cancel()
+    clients = [creator] + [player.client for player in seats] + list(watchers)
+    await asyncio.gather(*(client.disconnect() for client in clients))
+    await session.close()
+
+    server_cpu = None
+    if server_cpu_start is not None and server_cpu_end is not None:
+        server_cpu = {"cpu_s": server_cpu_end - server_cpu_start,
+                      "utilization": (server_cpu_end - server_cpu_start) / elapsed}
+    return {
+        "tables": tables,
+        "players": players,
+        "strategies": strategies,
+        "spectators": spectators,
+        "connect_s": connect_time,
+        "actions": actions,
+        "actions_per_sec": actions / elapsed,
+        "latency": _summary(all_latencies),
+        # Messages delivered to clients per action taken, by event and in total
+        "fan_out": {
+            "per_action": {event: count / max(actions, 1) for event, count in sorted(messages.items())},
+            "total_per_action": sum(messages.values()) / max(actions, 1),
+            "messages_per_sec": sum(messages.values()) / elapsed,
+        },
+        "server_cpu": server_cpu,
+        "load_generator_cpu_s": cpu_end.ru_utime + cpu_end.ru_stime - cpu_start.ru_utime - cpu_start.ru_stime,
+        "windows": windows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play hands with thousands of Socket.IO clients and measure "
+                                                 "latency, message fan-out and server CPU.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--players", type=int, default=4, help="players per table")
+    parser.add_argument("--strategies", nargs="+", default=["call", "mixed"], choices=sorted(STRATEGIES),
+                        help="assigned to seats in turn")
+    parser.add_argument("--spectators", type=int, default=0, help="clients watching each table")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of play to measure")
+    parser.add_argument("--window", type=float, default=10, help="seconds per latency window")
+    parser.add_argument("--timeout", type=float, default=10, help="seconds before an unanswered action counts as a stall")
+    parser.add_argument("--spawn", choices=("app", "asgi"), help="start app.py or asgi.py for the run")
+    parser.add_argument("--server-pid", type=int, help="pid of an already running server, for its CPU use")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="write the JSON report to this file (default: stdout)")
+    args = parser.parse_args()
+
+    _raise_file_limit()
+    server = _spawn(args.spawn, args.url) if args.spawn else None
+    try:
+        report = asyncio.run(load(args.url, args.tables, args.players, args.strategies, args.duration, args.window,
+                                  args.timeout, server.pid if server else args.server_pid, args.seed,
+                                  args.spectators))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
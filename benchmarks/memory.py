@@ -0,0 +1,111 @@
+import argparse
+import contextlib
+import gc
+import importlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tarfile
+import tempfile
+import tracemalloc
+
+from poker.game import PokerGame
+from poker.table_view import TableView
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEED = 1234
+
+
+def _seated_table(rng, players):
+    game = PokerGame(rng=rng, compute_equity=False)
+    for seat in range(players):
+        game.add_player(f"p{seat}")
+    game.start_game()
+    game.next_round()
+    return game
+
+
+def _baseline_game_class(revision, directory):
+    """PokerGame as it was at a git revision, imported from an extracted copy of its poker package.
+
+    The current poker modules are set aside while it is imported and put back
+    afterwards; the old classes keep working through their own module globals.
+    """
+    archive = subprocess.run(["git", "archive", revision, "poker"], cwd=ROOT, check=True, capture_output=True)
+    with tarfile.open(fileobj=io.BytesIO(archive.stdout)) as tar:
+        tar.extractall(directory)
+    current = {name: sys.modules.pop(name) for name in list(sys.modules) if name.split(".")[0] == "poker"}
+    sys.path.insert(0, directory)
+    try:
+        return importlib.import_module("poker.game").PokerGame
+    finally:
+        sys.path.remove(directory)
+        for name in [name for name in sys.modules if name.split(".")[0] == "poker"]:
+            del sys.modules[name]
+        sys.modules.update(current)
+
+
+def _baseline_table(game_class, players):
+    """A seated table on the flop, built with only the API every revision has."""
+    game = game_class()
+    for seat in range(players):
+        game.add_player(f"p{seat}")
+    game.start_game()
+    game.next_round()
+    return game
+
+
+def _footprint(build, count):
+    """Average bytes retained per object when count objects built by build() are kept alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / count
+
+
+def measure(tables=1000, players=6, baseline=None):
+    """Per-table memory of live PokerGame objects and of their struct-of-arrays views.
+
+    Cards, RNG and deck state are included in the table figures because every
+    live table holds them; the view only carries the per-seat columns. With
+    baseline, a git revision, tables of that revision's engine are measured
+    the same way for comparison.
+    """
+    rng = random.Random(SEED)
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        table_bytes = _footprint(lambda: _seated_table(rng, players), tables)
+        games = [_seated_table(rng, players) for _ in range(tables)]
+        view_bytes = _footprint(lambda: TableView(games[rng.randrange(tables)]), tables)
+        report = {
+            "tables": tables,
+            "players": players,
+            "table_bytes": round(table_bytes),
+            "view_bytes": round(view_bytes),
+        }
+        if baseline:
+            with tempfile.TemporaryDirectory() as directory:
+                game_class = _baseline_game_class(baseline, directory)
+                report["baseline"] = baseline
+                report["baseline_table_bytes"] = round(_footprint(lambda: _baseline_table(game_class, players), tables))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory footprint of live tables.")
+    parser.add_argument("--tables", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--baseline", help="git revision whose engine to measure as well, such as the first commit")
+    args = parser.parse_args()
+    print(json.dumps(measure(args.tables, args.players, args.baseline), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import aiohttp
+import socketio
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _summary(latencies):
+    if not latencies:
+        return {"samples": 0}
+    return {
+        "samples": len(latencies),
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def call(_):
+    return "call", 0
+
+
+class Seat:
+    """One playing client: follows the table's state and acts whenever it is its turn.
+
+    strategy(rng) picks the (action, amount) to send; by default it always
+    calls. The latency of an action is the time from emitting player_action
+    until this client receives the resulting state patch (or the hand's
+    result). With a received Counter, every message the client gets is
+    counted by event name.
+    """
+
+    def __init__(self, client, game_id, name, starter, latencies, stalls, strategy=call, rng=None, received=None):
+        self.client = client
+        self.game_id = game_id
+        self.name = name
+        self.starter = starter  # Restarts the hand after each result, like the browser client
+        self.latencies = latencies
+        self.stalls = stalls
+        self.strategy = strategy
+        self.rng = rng
+        self.received = received
+        self.actions = 0
+        self.current_player = None
+        self.version = None
+        self.sent_at = None
+        self.playing = False
+        client.on("game_state", self.on_state)
+        client.on("game_state_patch", self.on_patch)
+        client.on("game_result", self.on_result)
+        if received is not None:
+            for event in ("player_hand", "update_games", "join_error", "game_deleted", "start_new_game"):
+                client.on(event, self.count_only(event))
+
+    def count_only(self, event):
+        async def count(*_):
+            self.received[event] += 1
+        return count
+
+    def count(self, event):
+        if self.received is not None:
+            self.received[event] += 1
+
+    async def on_state(self, state):
+        self.count("game_state")
+        self.version = state.get("version")
+        self.current_player = state.get("current_player")
+        await self.answered()
+
+    async def on_patch(self, patch):
+        self.count("game_state_patch")
+        if self.version is not None and patch["version"] <= self.version:
+            return
+        if patch["base"] != self.version:
+            await self.client.emit("request_state", {"game_id": self.game_id})
+            return
+        self.version = patch["version"]
+        self.current_player = patch.get("set", {}).get("current_player", self.current_player)
+        await self.answered()
+
+    async def on_result(self, _):
+        self.count("game_result")
+        await self.answered()
+        if self.starter:
+            await self.client.emit("start_new_game", {"game_id": self.game_id})
+
+    async def answered(self):
+        if self.sent_at is not None:
+            self.latencies.append(time.perf_counter() - self.sent_at)
+            self.sent_at = None
+        await self.act()
+
+    async def act(self):
+        if self.playing and self.sent_at is None and self.current_player == self.name:
+            action, amount = self.strategy(self.rng)
+            self.sent_at = time.perf_counter()
+            self.actions += 1
+            await self.client.emit("player_action",
+                                   {"game_id": self.game_id, "name": self.name, "action": action, "amount": amount})
+
+    async def watchdog(self, timeout):
+        """Unstick a seat whose action got no answer (e.g. it raced a new hand)."""
+        while self.playing:
+            await asyncio.sleep(timeout / 2)
+            if self.sent_at is not None and time.perf_counter() - self.sent_at > timeout:
+                self.stalls.append(self.name)
+                self.sent_at = None
+                await self.client.emit("request_state", {"game_id": self.game_id})
+
+
+async def _connect(url, session, attempts=5, handlers=None):
+    """Open one websocket client, backing off and retrying while the server is saturated.
+
+    handlers maps event names to handlers registered before connecting, so
+    messages sent on connect are not missed.
+    """
+    for attempt in range(attempts):
+        client = socketio.AsyncClient(reconnection=False, http_session=session)
+        for event, handler in (handlers or {}).items():
+            client.on(event, handler)
+        try:
+            await client.connect(url, transports=["websocket"], wait_timeout=30)
+            return client
+        except socketio.exceptions.ConnectionError:
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+    return None
+
+
+async def _create_table(url, session, index, players, latencies, stalls):
+    """Connect a table's players, create the game and seat them; returns the seats."""
+    clients = [await _connect(url, session) for _ in range(players)]
+    created = asyncio.get_running_loop().create_future()
+    clients[0].on("update_games", lambda games: created.done() or created.set_result(games[-1]))
+    await clients[0].emit("create_game")
+    game_id = await asyncio.wait_for(created, 10)
+    seats = []
+    for seat, client in enumerate(clients):
+        name = f"soak-{index}-{seat}"
+        seats.append(Seat(client, game_id, name, seat == 0, latencies, stalls))
+        await client.emit("join_game", {"game_id": game_id, "name": name})
+    return seats
+
+
+async def soak(urls, clients, tables, players, duration, window, timeout):
+    """Spread tables and idle clients round-robin over urls (one per shard when sharded)."""
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    latencies, stalls = [], []
+    seats = []
+    for index in range(tables):
+        seats.extend(await _create_table(urls[index % len(urls)], session, index, players, latencies, stalls))
+
+    idle_count = max(0, clients - len(seats))
+    print(f"Connecting {idle_count} idle clients...", file=sys.stderr)
+    start = time.perf_counter()
+    gate = asyncio.Semaphore(50)
+
+    async def connect_idle(url):
+        async with gate:
+            return await _connect(url, session)
+
+    idle = await asyncio.gather(*(connect_idle(urls[index % len(urls)]) for index in range(idle_count)))
+    connect_time = time.perf_counter() - start
+    print(f"{len(idle) + len(seats)} clients connected in {connect_time:.1f}s", file=sys.stderr)
+
+    for seat in seats:
+        seat.playing = True
+    watchdogs = [asyncio.create_task(seat.watchdog(timeout)) for seat in seats]
+    for seat in seats:
+        if seat.starter:
+            await seat.client.emit("start_new_game", {"game_id": seat.game_id})
+
+    windows = []
+    cpu_start = resource.getrusage(resource.RUSAGE_SELF)
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        await asyncio.sleep(window)
+        sample, latencies[:] = list(latencies), []
+        connected = sum(client.connected for client in idle) + sum(seat.client.connected for seat in seats)
+        windows.append({"connected": connected, "stalls": len(stalls), **_summary(sample)})
+        print(f"window {len(windows)}: {json.dumps(windows[-1])}", file=sys.stderr)
+    cpu_end = resource.getrusage(resource.RUSAGE_SELF)
+
+    for seat in seats:
+        seat.playing = False
+    for task in watchdogs:
+        task.cancel()
+    await asyncio.gather(*(client.disconnect() for client in idle + [seat.client for seat in seats]))
+    await session.close()
+
+    p99s = [w["p99_ms"] for w in windows if w["samples"]]
+    return {
+        "clients": len(idle) + len(seats),
+        "tables": tables,
+        "players": players,
+        "connect_s": connect_time,
+        "load_generator_cpu_s": cpu_end.ru_utime + cpu_end.ru_stime - cpu_start.ru_utime - cpu_start.ru_stime,
+        "windows": windows,
+        # Stable latency means the last window's tail looks like the first one's
+        "p99_drift": p99s[-1] / p99s[0] if len(p99s) > 1 else None,
+    }
+
+
+def _raise_file_limit():
+    """Each connection needs a descriptor on both ends; lift the soft limit as far as allowed."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hold thousands of Socket.IO clients open and track action latency.")
+    parser.add_argument("--url", nargs="+", default=["http://127.0.0.1:8000"],
+                        help="server URL, or one URL per worker of a sharded server")
+    parser.add_argument("--clients", type=int, default=5000, help="total connections, playing and idle")
+    parser.add_argument("--tables", type=int, default=20, help="tables actively playing hands")
+    parser.add_argument("--players", type=int, default=2, help="players per active table")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of play to measure")
+    parser.add_argument("--window", type=float, default=10, help="seconds per latency window")
+    parser.add_argument("--timeout", type=float, default=5, help="seconds before an unanswered action counts as a stall")
+    parser.add_argument("--spawn-server", action="store_true", help="start the ASGI server (asgi.py) for the run")
+    parser.add_argument("--output", help="write the JSON report to this file (default: stdout)")
+    args = parser.parse_args()
+
+    _raise_file_limit()
+    server = None
+    if args.spawn_server:
+        port = args.url[0].rsplit(":", 1)[-1]
+        server = subprocess.Popen(  # pylint: disable=consider-using-with
+            [sys.executable, "asgi.py", "--port", port, "--shards", str(len(args.url))],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.DEVNULL,
+        )
+        time.sleep(2)
+    try:
+        report = asyncio.run(soak(args.url, args.clients, args.tables, args.players,
+                                  args.duration, args.window, args.timeout))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
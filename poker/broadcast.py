@@ -0,0 +1,19 @@
+import time
+
+
+def broadcast_ticks(tick, spectator_interval, clock=time.monotonic):
+    """Yield (seconds to sleep, whether spectators are due) for each broadcast tick.
+
+    Ticks are laid out on a fixed grid from the start rather than slept
+    between, so time spent flushing does not stretch the interval; a tick
+    missed because a flush overran is skipped, not bunched. Without a tick
+    (updates sent after every event) only the spectator ticks remain.
+    """
+    tick = tick or spectator_interval
+    next_tick = next_spectators = clock()
+    while True:
+        next_tick = max(next_tick + tick, clock())
+        spectators = next_tick >= next_spectators
+        if spectators:
+            next_spectators = max(next_spectators + spectator_interval, next_tick)
+        yield max(next_tick - clock(), 0.0), spectators
@@ -1,13 +1,101 @@
 import random
+from array import array
+
+import numpy as np
 
 suits = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
 ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
 
+RANK_INDEX = {rank: i for i, rank in enumerate(ranks)}
+SUIT_INDEX = {suit: i for i, suit in enumerate(suits)}
+SUIT_SYMBOLS = ['♥', '♦', '♣', '♠']
+
+FULL_DECK = array('b', range(52))
+
+
+def card_to_int(card):
+    """Encode a card dict as an integer 0-51 (rank index * 4 + suit index)."""
+    return RANK_INDEX[card['rank']] * 4 + SUIT_INDEX[card['suit']]
+
+
+def int_to_card(value):
+    """Decode an integer card back into the dict used by the frontend."""
+    return {'rank': ranks[value >> 2], 'suit': suits[value & 3]}
+
+
+def serialize_cards(cards):
+    """Card dicts for the frontend; the engine itself only handles integers."""
+    return [int_to_card(card) for card in cards]
+
+
+def format_cards(cards):
+    """Short human-readable form for log lines, e.g. 'A♠ 10♥'."""
+    return ' '.join(ranks[card >> 2] + SUIT_SYMBOLS[card & 3] for card in cards)
+
+
+_MASK64 = (1 << 64) - 1
+
+
+class HandStream:
+    """Seeded SplitMix64 generator, just enough of random.Random for dealing a hand.
+
+    Its state is a single integer rather than a Mersenne Twister's 2.5 KB, which
+    adds up with thousands of live tables. Draws are 64-bit, so the modulo bias
+    in randrange is negligible for a 52-card deck.
+    """
+
+    __slots__ = ("state",)
+
+    def __init__(self, seed):
+        self.state = seed & _MASK64
+
+    def randrange(self, stop):
+        self.state = (self.state + 0x9E3779B97F4A7C15) & _MASK64
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        return (z ^ (z >> 31)) % stop
+
+
 class Deck:
-    def __init__(self):
-        self.cards = [{'rank': rank, 'suit': suit} for rank in ranks for suit in suits]
-        random.shuffle(self.cards)
+    """52 integer cards in a preallocated array, shuffled lazily as they are dealt.
+
+    Each deal is one step of a Fisher-Yates shuffle: a card is drawn uniformly
+    from the undealt part and swapped to the end, so only dealt cards cost
+    random numbers. Pass a seeded random.Random or HandStream to make the deal
+    reproducible.
+    """
+
+    __slots__ = ("rng", "cards", "remaining")
+
+    def __init__(self, rng=None):
+        self.rng = rng or random
+        self.cards = array('b', FULL_DECK)
+        self.remaining = 52
 
     def deal(self, num):
         """Deal a specified number of cards."""
-        return [self.cards.pop() for _ in range(num)]
+        cards = self.cards
+        dealt = []
+        for _ in range(num):
+            pick = self.rng.randrange(self.remaining)
+            self.remaining -= 1
+            last = self.remaining
+            cards[pick], cards[last] = cards[last], cards[pick]
+            dealt.append(cards[last])
+        return dealt
+
+
+def deal_batch(count, num_cards, rng, dead=()):
+    """Deal count independent num_cards-card draws at once for simulations.
+
+    Cards in dead are left out of the deck. rng is a numpy Generator; the
+    result is a (count, num_cards) integer array, one deal per row.
+    """
+    excluded = set(dead)
+    live = np.array([card for card in range(52) if card not in excluded], dtype=np.intp)
+    if not num_cards:
+        return np.empty((count, 0), dtype=np.intp)
+    # The num_cards smallest of a row of uniform keys form a uniform random subset
+    picks = rng.random((count, len(live))).argpartition(num_cards - 1, axis=1)[:, :num_cards]
+    return live[picks]
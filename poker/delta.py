@@ -0,0 +1,33 @@
+def diff_state(previous, current):
+    """Describe how to turn the public table state previous into current.
+
+    Returns {"set": {...}, "board_append": [...], "players": ...} holding only
+    what changed, or None when nothing did. Apart from board_append, values
+    are absolute. While the seating is unchanged, "players" maps a seat index to
+    that player's changed fields; otherwise it carries the full players list.
+    """
+    patch = {}
+    changed = {
+        key: value for key, value in current.items()
+        if key not in ("players", "version") and previous.get(key) != value
+    }
+    # A new street only appends cards to the board, so send just the new ones
+    old_board, new_board = previous.get("community_cards", []), current.get("community_cards", [])
+    if "community_cards" in changed and old_board and new_board[:len(old_board)] == old_board:
+        del changed["community_cards"]
+        patch["board_append"] = new_board[len(old_board):]
+    if changed:
+        patch["set"] = changed
+
+    old_players, new_players = previous.get("players", []), current["players"]
+    if [p["name"] for p in old_players] != [p["name"] for p in new_players]:
+        patch["players"] = new_players
+    else:
+        seats = {}
+        for index, (old, new) in enumerate(zip(old_players, new_players)):
+            fields = {key: value for key, value in new.items() if old.get(key) != value}
+            if fields:
+                seats[str(index)] = fields
+        if seats:
+            patch["players"] = seats
+    return patch or None
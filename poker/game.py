@@ -1,15 +1,41 @@
-from poker.deck import Deck
-from poker.hand_evaluator import evaluate_hand
-from poker.player import Player
+import logging
+import random
+
+from poker.deck import Deck, HandStream, format_cards, serialize_cards
+from poker.delta import diff_state
+from poker.equity import runout_equity
+from poker.hand_evaluator import evaluate_ints
+from poker.history import ACTION_CODES, SKIP
+from poker.metrics import timed
+from poker.player import ACTIVE, ALL_IN, FOLDED, STATUS_NAMES, Player
+from poker.preflop import preflop_equity
+from poker.side_pots import build_pots, settle_pots
+
+log = logging.getLogger(__name__)
+ENGINE_SECONDS = "poker_engine_seconds"
+ENGINE_HELP = "Time spent in PokerGame calls on the hot path."
 
 
 class PokerGame:
-    def __init__(self):
+    __slots__ = (
+        "rng", "hand_seed", "compute_equity", "debug", "players", "seats", "pot", "community_cards", "deck",
+        "current_round", "current_turn_index", "dealer_index", "small_blind_amount", "big_blind_amount",
+        "small_blind_index", "big_blind_index", "minimum_bet", "waiting_for_players", "all_in_equity",
+        "showdown_pots", "state_version", "published_state", "live_count", "all_in_count", "highest_bet",
+        "to_act", "forfeited_bets", "game_id", "history",
+    )
+    rounds = ("preflop", "flop", "turn", "river", "showdown")  # Shared by every table
+
+    def __init__(self, rng=None, compute_equity=True, debug=False, game_id=None, history=None):
+        self.rng = rng or random  # Table RNG stream; pass a seeded random.Random to replay tables
+        self.hand_seed = None  # Seed of the current hand's deck, enough to replay its deal
+        self.compute_equity = compute_equity  # Work out equities on all-in runouts
+        self.debug = debug  # Cross-check cached bookkeeping after every change
         self.players = []
+        self.seats = {}  # Player name -> Player, for O(1) get_player
         self.pot = 0
         self.community_cards = []
-        self.deck = Deck()
-        self.rounds = ["preflop", "flop", "turn", "river", "showdown"]
+        self.deck = Deck(self.rng)  # Replaced by a per-hand seeded deck in start_game
         self.current_round = 0
         self.current_turn_index = 0  # 🔥 Track turn order
         # Blinds and dealer
@@ -20,17 +46,81 @@ class PokerGame:
         self.big_blind_index = 0
         self.minimum_bet = self.big_blind_amount
         self.waiting_for_players = False  # Flag to indicate waiting state
+        self.all_in_equity = None  # Equities from the most recent all-in runout
+        self.showdown_pots = None  # Pot breakdown from the most recent showdown
+        self.state_version = 0  # Bumped every time a state patch is published
+        self.published_state = {}  # Public state as of state_version, sent for full resyncs
+        # Bookkeeping kept up to date as actions happen instead of rescanning players
+        self.live_count = 0  # Players who have not folded
+        self.all_in_count = 0  # Live players who are all-in
+        self.highest_bet = 0  # Highest bet among live players
+        self.to_act = set()  # Live players who still have to act or match the highest bet
+        self.forfeited_bets = 0  # Bets left in the pot by players who left mid-hand
+        self.game_id = game_id
+        self.history = history  # Optional poker.history.HandHistoryWriter recording every hand
 
     def add_player(self, name):
         if len(self.players) < 6:
-            self.players.append(Player(name))
-            print(f"✅ Player added: {name}. Current players: {[p.name for p in self.players]}")
+            player = Player(name)
+            self.players.append(player)
+            self.seats.setdefault(name, player)
+            self.recount()  # A player seated mid-hand is live and still has to act
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("✅ Player added: %s. Current players: %s", name, [p.name for p in self.players])
+            if self.history:
+                self.history.seated(self, player)
+
+    def deal_hole_cards(self, player):
+        """Deal two cards to a player who sat down after the hand was dealt."""
+        player.hand = self.deck.deal(2)
+        if self.history:
+            self.history.dealt(self, player)
+
+    def remove_player(self, name):
+        """Take a player off the table; chips they already bet stay in the pot."""
+        player = self.get_player(name)
+        if player:
+            if self.history:
+                self.history.left(self, self.players.index(player), player)
+            self.players.remove(player)
+            self._reseat()
+            self.forfeited_bets += player.bet_amount
+            self.recount()
+        return player
+
+    def recount(self):
+        """Rebuild the cached table bookkeeping from scratch."""
+        live_players = [p for p in self.players if p.status != FOLDED]
+        self.live_count = len(live_players)
+        self.all_in_count = sum(1 for p in live_players if p.status == ALL_IN)
+        self.highest_bet = max((p.bet_amount for p in live_players), default=0)
+        self.to_act = {
+            p for p in live_players
+            if p.status == ACTIVE and (not p.has_acted or p.bet_amount < self.highest_bet)
+        }
 
-    def get_player(self, name):
+    def check_invariants(self):
+        """Raise AssertionError if the cached bookkeeping disagrees with a full recount."""
+        cached = (self.live_count, self.all_in_count, self.highest_bet, set(self.to_act))
+        self.recount()
+        expected = (self.live_count, self.all_in_count, self.highest_bet, self.to_act)
+        assert cached == expected, f"cached table state {cached} != recomputed {expected}"
+        seats = dict(self.seats)
+        self._reseat()
+        assert seats == self.seats, f"seat index {sorted(seats)} != players {[p.name for p in self.players]}"
+        if self.current_round < len(self.rounds) - 1 and not self.waiting_for_players:
+            # Until the pot is awarded it holds exactly what has been bet this hand
+            bets = sum(p.bet_amount for p in self.players) + self.forfeited_bets
+            assert self.pot == bets, f"pot {self.pot} != bets {bets}"
+
+    def _reseat(self):
+        """Rebuild the name index after players left the table; the first seat wins a duplicate name."""
+        self.seats = {}
         for player in self.players:
-            if player.name == name:
-                return player
-        return None
+            self.seats.setdefault(player.name, player)
+
+    def get_player(self, name):
+        return self.seats.get(name)
 
     def get_current_player(self):
         if not self.players or not (0 <= self.current_turn_index < len(self.players)):
@@ -39,33 +129,36 @@ class PokerGame:
 
     def next_turn(self):
         """Advances the turn order, skipping folded, all-in, or broke players."""
-        active_players = [p for p in self.players if p.status != "folded"]
-
-        if not active_players:
-            print("🚫 No active players left—game should end!")
+        if not self.live_count:
+            log.debug("🚫 No active players left—game should end!")
             return  # Prevent errors if everyone folds
 
         for _ in range(len(self.players)):
             self.current_turn_index = (self.current_turn_index + 1) % len(self.players)
             next_player = self.players[self.current_turn_index]
-            if next_player.status not in ("folded", "all-in") and next_player.chips > 0:
+            if next_player.status == ACTIVE and next_player.chips > 0:
                 return
-        print("⚠️ No eligible players left to act.")
+        log.debug("⚠️ No eligible players left to act.")
 
     def start_game(self):
         """Start a new game, ensuring minimum player count and assign blinds."""
+        self.all_in_equity = None  # The last runout's equities went out with its result, not with this hand
         # Exclude players with 0 chips
         self.players = [p for p in self.players if p.chips > 0]
+        self._reseat()
         if len(self.players) < 2:
-            print("❌ Not enough players to start the game! Waiting for more players.")
+            log.debug("❌ Not enough players to start the game! Waiting for more players.")
             # Optionally, set a waiting flag or notify frontend here
             self.waiting_for_players = True
+            self.recount()
             return
         self.waiting_for_players = False
 
-        self.deck = Deck()  # ✅ Reset the deck to shuffle new cards
+        self.hand_seed = self.rng.getrandbits(64)
+        self.deck = Deck(HandStream(self.hand_seed))  # ✅ Fresh deck, shuffled lazily as cards are dealt
         self.community_cards = []
         self.pot = 0
+        self.forfeited_bets = 0
         self.current_round = 0
         # Rotate dealer
         self.dealer_index = (self.dealer_index + 1) % len(self.players)
@@ -74,10 +167,12 @@ class PokerGame:
         self.current_turn_index = (self.dealer_index + 3) % len(self.players) if len(self.players) > 2 else self.big_blind_index
         self.minimum_bet = self.big_blind_amount
 
-        for i, player in enumerate(self.players):
+        show_cards = log.isEnabledFor(logging.DEBUG)
+        for player in self.players:
             player.reset_for_new_game()
             player.hand = self.deck.deal(2)  # 🎴 Ensure each player gets new hole cards
-            print(f"🃏 {player.name} received: {player.hand}")
+            if show_cards:
+                log.debug("🃏 %s received: %s", player.name, format_cards(player.hand))
 
         # Post blinds
         sb_player = self.players[self.small_blind_index]
@@ -85,27 +180,43 @@ class PokerGame:
         sb_bet = sb_player.bet(self.small_blind_amount)
         bb_bet = bb_player.bet(self.big_blind_amount)
         self.pot += sb_bet + bb_bet
-        print(f"💰 {sb_player.name} posts small blind ({sb_bet}), {bb_player.name} posts big blind ({bb_bet})")
+        log.debug("💰 %s posts small blind (%s), %s posts big blind (%s)",
+                  sb_player.name, sb_bet, bb_player.name, bb_bet)
         sb_player.has_acted = True
         bb_player.has_acted = True
+        self.recount()
+        if self.debug:
+            self.check_invariants()
+        if self.history:
+            self.history.hand_started(self)
 
-        print("♻️ New round started with at least two players!")
+        log.debug("♻️ New round started with at least two players!")
 
+    @timed(ENGINE_SECONDS, ENGINE_HELP, call="process_action")
     def process_action(self, name, action, amount=0):
+        result = self._apply_action(name, action, amount)
+        if self.debug:
+            self.check_invariants()
+        return result
+
+    def _apply_action(self, name, action, amount):
         current_player = self.get_current_player()
         if not current_player or name != current_player.name:
             actual_turn = current_player.name if current_player else "(no player)"
-            print(f"❌ Not {name}'s turn! It's {actual_turn}'s turn.")
+            log.debug("❌ Not %s's turn! It's %s's turn.", name, actual_turn)
             return
 
-        if current_player.chips == 0 or current_player.status == "all-in":
-            print(f"⛔ {name} cannot act (all-in or broke). Skipping.")
+        if current_player.chips == 0 or current_player.status == ALL_IN:
+            log.debug("⛔ %s cannot act (all-in or broke). Skipping.", name)
+            if self.history:
+                self.history.action(self, self.current_turn_index, SKIP, amount, 0)
             self.next_turn()
             return
 
-        print(f"🃏 Processing {name}'s action: {action}")
-
-        highest_bet = max((p.bet_amount for p in self.players if p.status != "folded"), default=0)
+        log.debug("🃏 Processing %s's action: %s", name, action)
+        self.all_in_equity = None
+        self.showdown_pots = None
+        bet_before = current_player.bet_amount
 
         if action == "fold":
             current_player.fold()
@@ -113,50 +224,51 @@ class PokerGame:
             bet_amount = current_player.bet(min(amount, current_player.chips))
             self.pot += bet_amount
         elif action == "call":
-            call_amount = min(highest_bet - current_player.bet_amount, current_player.chips)
+            call_amount = min(self.highest_bet - current_player.bet_amount, current_player.chips)
             if call_amount > 0:
                 bet_amount = current_player.bet(call_amount)
                 self.pot += bet_amount
             # Mark as acted even if call_amount is 0 (checking)
         else:
-            print(f"❌ Invalid action: {action}")
+            log.info("❌ Invalid action from %s: %r", name, action)
             return
 
         current_player.has_acted = True
-
-        active_players = [p for p in self.players if p.status != "folded"]
-        all_in_or_folded_or_broke = all(p.status in ("all-in", "folded") or p.chips == 0 for p in active_players)
-        highest_bet = max((p.bet_amount for p in active_players), default=0)
-
-        if len(active_players) == 1:
-            winner = active_players[0]
-            winner.award_winnings(self.pot)
+        self._record_action(current_player)
+        if self.history:
+            self.history.action(self, self.current_turn_index, ACTION_CODES[action], amount,
+                                current_player.bet_amount - bet_before)
+
+        if self.live_count == 1:
+            winner = next(p for p in self.players if p.status != FOLDED)
+            self._pay(winner, self.pot)
+            if self.history:
+                self.history.hand_ended(self, self.pot)
             winner_data = {"winner": winner.name, "pot": self.pot}
-            print(f"🎉 Winner announced due to fold: {winner_data}")
+            log.debug("🎉 Winner announced due to fold: %s", winner_data)
             self.start_game()  # Automatically start a new game
             return winner_data
 
-        if all_in_or_folded_or_broke:
-            print("🏁 All players are all-in, folded, or broke. Dealing out the board and proceeding to showdown!")
-            while self.current_round < len(self.rounds) - 2:
-                self.next_round()
+        if self.live_count == self.all_in_count:
+            log.debug("🏁 All players are all-in, folded, or broke. Dealing out the board and proceeding to showdown!")
+            self.run_out_board()
             winner_name = self.determine_winner()
-            result = {"winner": winner_name, "pot": self.pot}
+            result = {"winner": winner_name, "pot": self.pot, "equity": self.all_in_equity, "pots": self.showdown_pots}
             self.start_game()
             return result
 
         # Only advance round if all active players have acted and matched the highest bet
-        if all(p.has_acted for p in active_players) and all(p.bet_amount == highest_bet for p in active_players):
+        # (an all-in player for less than the highest bet cannot match it and is not waited on)
+        if not self.to_act:
             # If any player is all-in and no one can raise, go straight to showdown
-            if any(p.status == "all-in" for p in active_players):
-                print("🏁 All-in situation: dealing out the board and proceeding to showdown!")
-                while self.current_round < len(self.rounds) - 2:
-                    self.next_round()
+            if self.all_in_count:
+                log.debug("🏁 All-in situation: dealing out the board and proceeding to showdown!")
+                self.run_out_board()
                 winner_name = self.determine_winner()
-                result = {"winner": winner_name, "pot": self.pot}
+                result = {"winner": winner_name, "pot": self.pot, "equity": self.all_in_equity, "pots": self.showdown_pots}
                 self.start_game()
                 return result
-            print("🔄 All players have acted, advancing round!")
+            log.debug("🔄 All players have acted, advancing round!")
             for p in self.players:
                 p.has_acted = False  # Reset for next round
             self.next_round()
@@ -164,121 +276,136 @@ class PokerGame:
 
         self.next_turn()
 
+    def _record_action(self, player):
+        """Update the cached bookkeeping after player folded, checked, called or raised."""
+        if player.status == FOLDED:
+            self.live_count -= 1
+            self.to_act.discard(player)
+            if player.bet_amount == self.highest_bet:
+                # Rare: a lower highest bet may already be matched by players who acted, so recount
+                self.recount()
+            return
+        if player.status == ALL_IN:
+            self.all_in_count += 1
+        if player.bet_amount > self.highest_bet:
+            # A raise reopens the action for everyone else who can still bet
+            self.highest_bet = player.bet_amount
+            self.to_act.update(p for p in self.players if p.status == ACTIVE)
+        if player.status == ALL_IN or player.bet_amount == self.highest_bet:
+            self.to_act.discard(player)
+
+    def run_out_board(self):
+        """Record all-in equities (estimated preflop, exact later), then deal the remaining community cards."""
+        live_players = [p for p in self.players if p.status != FOLDED and p.hand]
+        if self.compute_equity and len(live_players) >= 2 and len(self.community_cards) < 5:
+            result = runout_equity([p.hand for p in live_players], self.community_cards)
+            self.all_in_equity = {
+                p.name: odds for p, odds in zip(live_players, result["players"])
+            }
+            log.debug("📊 All-in equity over %s runouts: %s", result["samples"], self.all_in_equity)
+        while self.current_round < len(self.rounds) - 2:
+            self.next_round()
+
     def next_round(self):
         """Advance the game to the next round, ensuring correct indexing and turn order."""
         if self.current_round + 1 >= len(self.rounds):
-            print("🏆 Game has reached showdown!")
+            log.debug("🏆 Game has reached showdown!")
             self.current_round = len(self.rounds) - 1
             return {"winner": self.determine_winner(), "pot": self.pot}
 
         self.current_round += 1
-        print(f"🔄 Moving to next round: {self.rounds[self.current_round]}")
+        log.debug("🔄 Moving to next round: %s", self.rounds[self.current_round])
 
         if self.rounds[self.current_round] == "flop":
             self.community_cards.extend(self.deck.deal(3))
-            print(f"🃏 Flop cards revealed: {self.community_cards}")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("🃏 Flop cards revealed: %s", format_cards(self.community_cards))
         elif self.rounds[self.current_round] in ["turn", "river"]:
             self.community_cards.append(self.deck.deal(1)[0])
-            print(f"🃏 {self.rounds[self.current_round]} card added: {self.community_cards[-1]}")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("🃏 %s card added: %s",
+                          self.rounds[self.current_round], format_cards(self.community_cards[-1:]))
+        if self.history:
+            self.history.board(self)
 
         # Reset has_acted for all players
         for p in self.players:
             p.has_acted = False
+        self.recount()
+        if self.debug:
+            self.check_invariants()
         # Set turn to the next eligible player
         for idx, p in enumerate(self.players):
-            if p.status not in ("folded", "all-in") and p.chips > 0:
+            if p.status == ACTIVE and p.chips > 0:
                 self.current_turn_index = idx
                 break
 
+    @timed(ENGINE_SECONDS, ENGINE_HELP, call="determine_winner")
     def determine_winner(self):
         """Evaluate the best poker hand and declare a winner, handling side pots only if needed."""
-        eligible_players = [p for p in self.players if p.status != "folded"]
-        if not eligible_players:
+        winners = self._award_pots()
+        self.recount()  # Winners' bets were cleared when they were paid
+        if self.history:
+            self.history.hand_ended(self, self.pot)
+        return winners
+
+    def _pay(self, player, amount):
+        player.award_winnings(amount)
+        if self.history:
+            self.history.award(self, player, amount)
+
+    def _award_pots(self):
+        live_players = [p for p in self.players if p.status != FOLDED]
+        if not live_players:
             return None
 
-        # Check if all eligible players have the same bet amount (no side pot needed)
-        bet_amounts = set(p.bet_amount for p in eligible_players)
-        if len(bet_amounts) == 1:
-            # Normal case: award the whole pot to the best hand
-            best_hand = None
-            best_players = []
-            for player in eligible_players:
-                hand_strength = evaluate_hand(player.hand + self.community_cards)
-                if best_hand is None or hand_strength > best_hand:
-                    best_hand = hand_strength
-                    best_players = [player]
-                elif hand_strength == best_hand:
-                    best_players.append(player)
-            share = self.pot // len(best_players)
-            for winner in best_players:
-                winner.award_winnings(share)
-            remainder = self.pot % len(best_players)
-            if remainder:
-                best_players[0].award_winnings(remainder)
-            names = ', '.join([p.name for p in best_players])
-            print(f"🏆 Winner(s): {names}")
-            return names
-
-        # Otherwise, use side pot logic
-        contributions = [(p, p.bet_amount) for p in self.players]
-        pots = []
-        while True:
-            nonzero = [amt for _, amt in contributions if amt > 0]
-            if not nonzero:
-                break
-            min_bet = min(nonzero)
-            pot_players = [p for p, amt in contributions if amt > 0]
-            pot_amount = min_bet * len(pot_players)
-            pots.append((pot_players, pot_amount))
-            contributions = [
-                (p, amt - min_bet if amt > 0 else 0)
-                for p, amt in contributions
-            ]
-
-        winners = []
-        for pot_players, pot_amount in pots:
-            best_hand = None
-            best_players = []
-            for player in pot_players:
-                hand_strength = evaluate_hand(player.hand + self.community_cards)
-                if best_hand is None or hand_strength > best_hand:
-                    best_hand = hand_strength
-                    best_players = [player]
-                elif hand_strength == best_hand:
-                    best_players.append(player)
-            share = pot_amount // len(best_players)
-            for winner in best_players:
-                winner.award_winnings(share)
-            winners.append((best_players, share))
-            remainder = pot_amount % len(best_players)
-            if remainder:
-                best_players[0].award_winnings(remainder)
-        main_pot_winners = winners[0][0] if winners else []
-        if main_pot_winners:
-            names = ', '.join([p.name for p in main_pot_winners])
-            print(f"🏆 Winner(s): {names}")
-            return names
-        return None
-
-    def get_state(self):
-        highest_bet = max((p.bet_amount for p in self.players if p.status != "folded"), default=0)
+        # Score every live hand exactly once; higher scores are stronger hands
+        scores = {p.name: evaluate_ints(p.hand + self.community_cards) for p in live_players}
+        pots = build_pots({p.name: p.bet_amount for p in self.players}, scores.keys(), self.forfeited_bets)
+        settle_pots(pots, scores)
+
+        for pot in pots:
+            for name in pot["winners"]:
+                self._pay(self.get_player(name), pot["share"])
+            if pot["odd_chip_to"]:
+                self._pay(self.get_player(pot["odd_chip_to"]), pot["odd_chips"])
+        self.showdown_pots = pots
+
+        names = ', '.join(pots[0]["winners"])
+        log.debug("🏆 Winner(s): %s with %s", names, pots[0]["hand"])
+        return names
+
+    def preflop_hint(self, player):
+        """Table-lookup all-in equity of a player's hole cards against the other live players."""
+        return preflop_equity(player.hand, self.live_count - 1)
+
+    @timed(ENGINE_SECONDS, ENGINE_HELP, call="get_state")
+    def get_state(self, include_hands=True):
+        """Serialize the table; pass include_hands=False for state shared with the whole room.
+
+        With hands included, each player also gets a preflop_equity hint
+        (None until the preflop table is built).
+        """
+        highest_bet = self.highest_bet
+        current_player = self.get_current_player()
 
         return {
             "players": [
                 {
                     "name": p.name,
                     "chips": p.chips,
-                    "status": p.status,
+                    "status": STATUS_NAMES[p.status],
                     "bet_amount": p.bet_amount,
                     "call_amount": max(0, highest_bet - p.bet_amount),
-                    "hand": [{"rank": c["rank"], "suit": c["suit"]} for c in p.hand] if isinstance(p.hand, list) and p.hand else []
+                    "hand": serialize_cards(p.hand) if include_hands else [],
+                    **({"preflop_equity": self.preflop_hint(p)} if include_hands else {}),
                 }
                 for p in self.players if p.name and isinstance(p.hand, list)
             ],
             "pot": self.pot,
-            "community_cards": [{"rank": c["rank"], "suit": c["suit"]} for c in self.community_cards] if self.community_cards else [],
+            "community_cards": serialize_cards(self.community_cards),
             "current_round": self.rounds[self.current_round],
-            "current_player": self.get_current_player().name if self.get_current_player() else None,
+            "current_player": current_player.name if current_player else None,
             "highest_bet": highest_bet,
             "dealer_index": self.dealer_index,
             "small_blind_index": self.small_blind_index,
@@ -286,4 +413,23 @@ class PokerGame:
             "small_blind_amount": self.small_blind_amount,
             "big_blind_amount": self.big_blind_amount,
             "minimum_bet": self.minimum_bet,
+            "all_in_equity": self.all_in_equity,
+            "pots": self.showdown_pots,
+            "version": self.state_version,
         }
+
+    def get_state_patch(self):
+        """Publish the public state as a versioned diff against the last published one.
+
+        Returns None when nothing changed. A client holding version "base"
+        applies the patch to reach "version"; anyone else should ask for a full
+        get_state instead.
+        """
+        state = self.get_state(include_hands=False)
+        changes = diff_state(self.published_state, state)
+        if changes is None:
+            return None
+        self.state_version += 1
+        state["version"] = self.state_version
+        self.published_state = state
+        return {"version": self.state_version, "base": self.state_version - 1, **changes}
@@ -1,48 +1,165 @@
-from collections import Counter
+import numpy as np
 
-def is_straight(ranks):
-    """Check if ranks form a sequential straight."""
-    rank_values = sorted([rank_to_value(r) for r in ranks])
-    return rank_values == list(range(rank_values[0], rank_values[0] + 5))
+from poker.deck import card_to_int
 
-def is_flush(suits):
-    """Check if all suits are the same."""
-    return len(set(suits)) == 1
+# Cards are integers 0-51: rank index (0 = '2' ... 12 = 'A') * 4 + suit index.
+# A score packs the hand category into bits 20-23 and up to five tie-breaking
+# ranks into the nibbles below it, so comparing two scores compares the hands.
+
+HAND_CATEGORIES = [
+    "High Card", "One Pair", "Two Pair", "Three of a Kind", "Straight",
+    "Flush", "Full House", "Four of a Kind", "Straight Flush",
+]
+
+HIGH_CARD, ONE_PAIR, TWO_PAIR, THREE_OF_A_KIND, STRAIGHT, \
+    FLUSH, FULL_HOUSE, FOUR_OF_A_KIND, STRAIGHT_FLUSH = range(9)
+
+# Each rank owns a 3-bit counter in the rank key (at most 4 cards per rank).
+RANK_KEYS = [1 << (3 * r) for r in range(13)]
+
+_WHEEL = (1 << 12) | 0b1111  # A-2-3-4-5
+
+
+def _pack(category, kickers):
+    score = category << 20
+    for i, rank in enumerate(kickers[:5]):
+        score |= rank << (16 - 4 * i)
+    return score
+
+
+def _straight_high(mask):
+    """Return the top rank of the best straight in a 13-bit rank mask, or -1."""
+    for high in range(12, 3, -1):
+        run = 0b11111 << (high - 4)
+        if mask & run == run:
+            return high
+    if mask & _WHEEL == _WHEEL:
+        return 3
+    return -1
+
+
+STRAIGHT_HIGH = [_straight_high(mask) for mask in range(8192)]
+
+
+def _score_groups(groups, mask):
+    """Score the best non-flush hand from (count, rank) pairs in descending rank order."""
+    quads = [r for c, r in groups if c == 4]
+    trips = [r for c, r in groups if c == 3]
+    pairs = [r for c, r in groups if c == 2]
+    singles = [r for c, r in groups if c == 1]
+
+    if quads:
+        return _pack(FOUR_OF_A_KIND, quads[:1] + [r for _, r in groups if r != quads[0]][:1])
+    if trips and len(trips) + len(pairs) >= 2:
+        return _pack(FULL_HOUSE, trips[:1] + sorted(trips[1:] + pairs[:1], reverse=True)[:1])
+    high = STRAIGHT_HIGH[mask]
+    if high >= 0:
+        return _pack(STRAIGHT, [high])
+    if trips:
+        return _pack(THREE_OF_A_KIND, trips + singles[:2])
+    if len(pairs) >= 2:
+        return _pack(TWO_PAIR, pairs[:2] + sorted(pairs[2:] + singles, reverse=True)[:1])
+    if pairs:
+        return _pack(ONE_PAIR, pairs + singles[:3])
+    return _pack(HIGH_CARD, singles[:5])
+
+
+def _build_rank_table():
+    """Map the rank key of every 0-7 card rank multiset to its non-flush score."""
+    table = {}
+
+    def fill(rank, left, key, mask, groups):
+        if rank < 0:
+            table[key] = _score_groups(groups, mask)
+            return
+        fill(rank - 1, left, key, mask, groups)
+        for count in range(1, min(4, left) + 1):
+            fill(rank - 1, left - count, key + count * RANK_KEYS[rank],
+                 mask | 1 << rank, groups + [(count, rank)])
+
+    fill(12, 7, 0, 0, [])
+    return table
+
+
+def _build_flush_table():
+    """Map every 13-bit suited rank mask with 5+ ranks to its flush score."""
+    table = [0] * 8192
+    for mask in range(8192):
+        if mask.bit_count() < 5:
+            continue
+        high = STRAIGHT_HIGH[mask]
+        if high >= 0:
+            table[mask] = _pack(STRAIGHT_FLUSH, [high])
+        else:
+            table[mask] = _pack(FLUSH, [r for r in range(12, -1, -1) if mask >> r & 1][:5])
+    return table
+
+
+RANK_TABLE = _build_rank_table()
+FLUSH_TABLE = _build_flush_table()
+
+
+def evaluate_ints(cards):
+    """Score up to seven integer-encoded cards; higher scores win."""
+    key = 0
+    masks = [0, 0, 0, 0]
+    for card in cards:
+        key += RANK_KEYS[card >> 2]
+        masks[card & 3] |= 1 << (card >> 2)
+    for mask in masks:
+        if mask.bit_count() >= 5:
+            return FLUSH_TABLE[mask]
+    return RANK_TABLE[key]
 
-def rank_to_value(rank):
-    """Convert card rank to numeric value for easier evaluation."""
-    rank_map = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6,
-                '7': 7, '8': 8, '9': 9, '10': 10,
-                'J': 11, 'Q': 12, 'K': 13, 'A': 14}
-    return rank_map.get(rank, 0)
 
 def evaluate_hand(cards):
-    """Evaluate hand strength using full Texas Hold'em rules."""
-    ranks = [card['rank'] for card in cards]
-    suits = [card['suit'] for card in cards]
-
-    rank_counts = Counter(ranks)
-    most_common = rank_counts.most_common()
-
-    flush = is_flush(suits)
-    straight = is_straight(ranks)
-
-    if flush and straight:
-        return "Straight Flush"
-    elif most_common[0][1] == 4:
-        return "Four of a Kind"
-    elif most_common[0][1] == 3 and most_common[1][1] == 2:
-        return "Full House"
-    elif flush:
-        return "Flush"
-    elif straight:
-        return "Straight"
-    elif most_common[0][1] == 3:
-        return "Three of a Kind"
-    elif most_common[0][1] == 2 and most_common[1][1] == 2:
-        return "Two Pair"
-    elif most_common[0][1] == 2:
-        return "One Pair"
-    else:
-        return "High Card"
+    """Score a list of card dicts (hole cards plus community cards)."""
+    return evaluate_ints([card_to_int(card) for card in cards])
+
+
+def hand_category(score):
+    """Return the display name of a hand score, e.g. "Full House"."""
+    return HAND_CATEGORIES[score >> 20]
+
+
+# NumPy views of the lookup tables for batched evaluation. The rank table is
+# stored as sorted keys so a batch of rank keys resolves with one searchsorted.
+RANK_KEY_ARRAY = np.array(RANK_KEYS, dtype=np.int64)
+RANK_TABLE_KEYS = np.array(sorted(RANK_TABLE), dtype=np.int64)
+RANK_TABLE_SCORES = np.array([RANK_TABLE[key] for key in RANK_TABLE_KEYS.tolist()], dtype=np.int32)
+FLUSH_TABLE_ARRAY = np.array(FLUSH_TABLE, dtype=np.int32)
+
+DEFAULT_CHUNK_SIZE = 1 << 18
+
+
+def _evaluate_block(hands):
+    """Score one block of integer hands with array ops and table gathers."""
+    ranks = hands >> 2
+    suits = hands & 3
+    keys = RANK_KEY_ARRAY[ranks].sum(axis=1)
+    scores = RANK_TABLE_SCORES[np.searchsorted(RANK_TABLE_KEYS, keys)]
+    # Per-suit card counts packed into nibbles; only flush rows need rank masks
+    suit_counts = np.left_shift(1, suits << 2).sum(axis=1)
+    for suit in range(4):
+        flush = ((suit_counts >> (suit << 2)) & 15) >= 5
+        if flush.any():
+            masks = np.where(suits[flush] == suit, np.left_shift(1, ranks[flush]), 0).sum(axis=1)
+            scores[flush] = FLUSH_TABLE_ARRAY[masks]
+    return scores
+
+
+def evaluate_many(hands, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score an (N, k) array of integer-encoded hands (k <= 7) in one call.
 
+    Returns an int32 array matching evaluate_ints row by row. Rows are scored
+    in blocks of chunk_size so temporary arrays stay bounded for very large N;
+    pass chunk_size=None to score everything in a single block.
+    """
+    hands = np.asarray(hands, dtype=np.intp)
+    if hands.ndim != 2 or hands.shape[1] > 7:
+        raise ValueError(f"expected an (N, k<=7) card array, got shape {hands.shape}")
+    scores = np.empty(len(hands), dtype=np.int32)
+    step = chunk_size or max(len(hands), 1)
+    for start in range(0, len(hands), step):
+        scores[start:start + step] = _evaluate_block(hands[start:start + step])
+    return scores
@@ -0,0 +1,247 @@
+import mmap
+import os
+import random
+import struct
+from collections import namedtuple
+
+# One fixed-width little-endian record: hand id, kind, round, seat, action,
+# five card slots (-1 when empty), amount, value and a short text field
+RECORD = struct.Struct("<QBBbB5b3xqQ20s")
+HAND_ID = struct.Struct("<Q")  # The leading hand id field alone, filled in when a hand is written
+Record = namedtuple("Record", "hand kind round seat action cards amount value text")
+
+# Record kinds, in the order they appear within a hand
+HAND_START = 0  # seat: dealer index, value: deck seed, text: game id
+SEAT = 1  # seat, amount: chips before blinds, text: player name (also written for mid-hand joins)
+HOLE = 2  # seat, cards: hole cards
+ACTION = 3  # seat, action, amount: chips requested, value: chips put in
+BOARD = 4  # round, cards: the whole board so far
+LEAVE = 5  # seat, text: player name
+AWARD = 6  # seat, amount: chips won
+HAND_END = 7  # amount: total pot
+
+# Action codes; BLIND is posted by the engine, the others come from process_action
+FOLD, CALL, RAISE, SKIP, BLIND = 0, 1, 2, 3, 4
+ACTION_CODES = {"fold": FOLD, "call": CALL, "raise": RAISE}
+ACTION_NAMES = {code: name for name, code in ACTION_CODES.items()}
+
+NO_CARDS = (-1,) * 5
+
+
+def _cards(cards):
+    return tuple(cards) + NO_CARDS[len(cards):]
+
+
+def _text(value):
+    """Encode into the 20-byte text field; longer names are cut at a character boundary."""
+    return value.encode("utf-8")[:20].decode("utf-8", "ignore").encode("utf-8")
+
+
+class HandHistoryWriter:
+    """Append-only hand log in rotated segment files of fixed-width records.
+
+    A hand's records are collected in memory and written in one piece when it
+    ends, so hands from many tables never interleave and each segment holds
+    whole hands; segments rotate only between hands once they pass
+    segment_bytes. Writes go through a buffered file, so recording costs a
+    struct.pack per event on the hot path. Hands that never finish are
+    written when their table is deleted, or when the writer is closed.
+
+    Hands are numbered as they are written, so ids grow through the log and
+    the last record holds the highest one, however many tables are playing.
+    A record torn by a crash is cut off before appending resumes.
+    """
+
+    def __init__(self, directory, prefix="hands-", segment_bytes=64 << 20, buffer_size=1 << 20):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.segment_bytes = segment_bytes
+        self.buffer_size = buffer_size
+        self.pending = {}  # PokerGame -> bytearray of its records so far, hand ids still 0
+        self.last_hand = 0
+        self.segment_number = 0
+        self.file = None
+        paths = segment_paths(directory, prefix)
+        if paths:
+            size = os.path.getsize(paths[-1])
+            if size % RECORD.size:
+                os.truncate(paths[-1], size - size % RECORD.size)  # Appended records must stay aligned
+        for path in reversed(paths):
+            # Continue the hand numbering of an existing log from its last record
+            records = os.path.getsize(path) // RECORD.size
+            if records:
+                self.last_hand = next(read_records(path, records - 1)).hand
+                break
+        self._open_segment(int(paths[-1][-10:-4]) if paths else 1)
+
+    def _open_segment(self, number):
+        if self.file:
+            self.file.close()
+        self.segment_number = number
+        path = os.path.join(self.directory, f"{self.prefix}{number:06d}.log")
+        self.file = open(path, "ab", buffering=self.buffer_size)  # pylint: disable=consider-using-with
+
+    def _write(self, records):
+        self.last_hand += 1
+        for offset in range(0, len(records), RECORD.size):
+            HAND_ID.pack_into(records, offset, self.last_hand)
+        if self.file.tell() >= self.segment_bytes:
+            self._open_segment(self.segment_number + 1)
+        self.file.write(records)
+
+    def _add(self, game, kind, seat=-1, action=0, cards=NO_CARDS, amount=0, value=0, text=b""):
+        self.pending[game] += RECORD.pack(0, kind, game.current_round, seat, action, *cards, amount, value, text)
+
+    def hand_started(self, game):
+        if game in self.pending:
+            self._write(self.pending.pop(game))  # The previous hand never finished
+        self.pending[game] = bytearray()
+        self._add(game, HAND_START, game.dealer_index, value=game.hand_seed, text=_text(game.game_id or ""))
+        for seat, player in enumerate(game.players):
+            self._add(game, SEAT, seat, amount=player.chips + player.bet_amount, text=_text(player.name))
+        for seat, requested in ((game.small_blind_index, game.small_blind_amount),
+                                (game.big_blind_index, game.big_blind_amount)):
+            self._add(game, ACTION, seat, BLIND, amount=requested, value=game.players[seat].bet_amount)
+        for seat, player in enumerate(game.players):
+            self._add(game, HOLE, seat, cards=_cards(player.hand))
+
+    def seated(self, game, player):
+        """A player joined while a hand was running."""
+        if game in self.pending:
+            self._add(game, SEAT, game.players.index(player), amount=player.chips, text=_text(player.name))
+
+    def dealt(self, game, player):
+        if game in self.pending:
+            self._add(game, HOLE, game.players.index(player), cards=_cards(player.hand))
+
+    def left(self, game, seat, player):
+        if game in self.pending:
+            self._add(game, LEAVE, seat, text=_text(player.name))
+
+    def action(self, game, seat, action, requested, paid):
+        if game in self.pending:
+            self._add(game, ACTION, seat, action, amount=requested, value=paid)
+
+    def board(self, game):
+        if game in self.pending:
+            self._add(game, BOARD, cards=_cards(game.community_cards))
+
+    def award(self, game, player, amount):
+        if game in self.pending:
+            self._add(game, AWARD, game.players.index(player), amount=amount)
+
+    def hand_ended(self, game, pot):
+        if game in self.pending:
+            self._add(game, HAND_END, amount=pot)
+            self._write(self.pending.pop(game))
+
+    def table_deleted(self, game):
+        """Write what was recorded of the hand a deleted table left unfinished."""
+        if game in self.pending:
+            self._write(self.pending.pop(game))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        for records in self.pending.values():
+            self._write(records)
+        self.pending.clear()
+        self.file.close()
+
+
+def segment_paths(directory, prefix="hands-"):
+    """Segment files in write order."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith(prefix) and name.endswith(".log"))
+
+
+def read_records(path, start=0):
+    """Yield the Records of one segment from record index start on.
+
+    The file is memory-mapped, so only the pages actually read are loaded.
+    """
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size < (start + 1) * RECORD.size:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)[start * RECORD.size:len(mapped) - len(mapped) % RECORD.size]
+            try:
+                for hand, kind, round_index, seat, action, *rest in RECORD.iter_unpack(view):
+                    *cards, amount, value, text = rest
+                    yield Record(hand, kind, round_index, seat, action, tuple(cards), amount, value,
+                                 text.rstrip(b"\0").decode("utf-8", "ignore"))
+            finally:
+                view.release()
+
+
+def read_hands(paths):
+    """Yield each hand as a list of its Records, one hand in memory at a time."""
+    hand = []
+    for path in paths:
+        for record in read_records(path):
+            if hand and record.hand != hand[0].hand:
+                yield hand
+                hand = []
+            hand.append(record)
+    if hand:
+        yield hand
+
+
+class _RecordedSeed:
+    """Stands in for the table RNG so start_game deals the recorded deck."""
+
+    def __init__(self, seed):
+        self.seed = seed
+
+    def getrandbits(self, _):
+        return self.seed
+
+
+def replay(records, actions=None):
+    """Rebuild the PokerGame of one recorded hand, stopped after its first actions player actions.
+
+    With actions=None the whole hand is replayed. Blinds are not counted as
+    actions. The deck is re-created from the recorded seed, so hole cards
+    and board come out exactly as they were dealt. An action that ends the
+    hand by folds or all-ins lets the engine deal the next hand, as it does
+    at a live table; stop one action earlier to inspect the finished hand.
+    """
+    from poker.game import PokerGame  # pylint: disable=import-outside-toplevel
+
+    game = PokerGame(compute_equity=False)
+    blinds = []
+    started = False
+    applied = 0
+    for record in records:
+        if record.kind == HAND_START:
+            seed, dealer = record.value, record.seat
+            game.game_id = record.text or None
+        elif record.kind == SEAT:
+            game.add_player(record.text)
+            game.players[-1].chips = record.amount
+        elif record.kind == ACTION and record.action == BLIND:
+            blinds.append(record.amount)
+        elif record.kind == HOLE and not started:
+            # Seats and blinds are known: deal the hand from its recorded seed
+            game.small_blind_amount, game.big_blind_amount = blinds[0], blinds[1]
+            game.dealer_index = (dealer - 1) % len(game.players)
+            game.rng = _RecordedSeed(seed)
+            game.start_game()
+            game.rng = random  # Hands the engine starts by itself are not part of this record
+            started = True
+        elif record.kind == HOLE and not game.players[record.seat].hand:
+            game.deal_hole_cards(game.players[record.seat])
+        elif record.kind == LEAVE:
+            game.remove_player(record.text)
+        elif record.kind == ACTION:
+            if actions is not None and applied >= actions:
+                break
+            player = game.players[record.seat]
+            game.process_action(player.name, ACTION_NAMES.get(record.action, "call"), record.amount)
+            applied += 1
+        elif record.kind == AWARD and game.rounds[game.current_round] == "showdown":
+            game.determine_winner()  # Showdowns are settled by the caller, not by process_action
+            break
+    return game
@@ -0,0 +1,26 @@
+from itertools import permutations
+
+# Card translation table for each of the 24 ways to relabel the four suits
+SUIT_PERMUTATIONS = [
+    bytes((card & ~3) | order[card & 3] for card in range(52)) for order in permutations(range(4))
+]
+
+
+def canonicalize(holes, board=()):
+    """Map a deal to the representative of its suit-isomorphism class.
+
+    Relabelling suits, reordering players, swapping a player's two hole
+    cards or reordering the board never changes anyone's equity, so every
+    deal in a class shares the lexicographically smallest form over the 24
+    suit relabellings: (sorted tuple of sorted hole pairs, sorted board).
+    Returns (key, seats) where seats[i] is the position of player i's hand
+    in the key, to map per-player results back.
+    """
+    best = ((((52, 52),), ()), [])  # Sorts after every real key, whose cards only go up to 51
+    for table in SUIT_PERMUTATIONS:
+        mapped = [(table[a], table[b]) if table[a] < table[b] else (table[b], table[a]) for a, b in holes]
+        key = (tuple(sorted(mapped)), tuple(sorted(table[card] for card in board)))
+        if key < best[0]:
+            best = (key, mapped)
+    key, mapped = best
+    return key, [key[0].index(hole) for hole in mapped]
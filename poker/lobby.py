@@ -0,0 +1,438 @@
+import logging
+
+from poker.deck import format_cards, serialize_cards
+from poker.delta import diff_state
+from poker.game import PokerGame
+from poker.player import FOLDED
+from poker.sessions import SessionRegistry
+
+log = logging.getLogger(__name__)
+
+
+class Lobby:
+    """All tables plus the Socket.IO event logic, independent of any server.
+
+    Each handler takes the caller's sid (and the event payload) and returns
+    the list of socket operations to perform, in order:
+    ("emit", event, data, to) where to is a sid, a room or None for every
+    client, ("enter_room", sid, room), ("leave_room", sid, room) and, for a
+    sharded worker, ("publish", message) to tell every worker about created
+    and deleted tables. The Flask app and the ASGI server only differ
+    in how they carry these out.
+
+    Pass a poker.sharding.Shard to run as one worker of a sharded deployment:
+    only tables owned by this worker are created here, and players joining
+    another worker's table are sent a "route" event with its URL. With a
+    history writer, every table records its hands to the hand-history log.
+    With a poker.turn_clock.TurnClock as clock, a player who does not act
+    in time is checked or folded by turn_expired.
+
+    Once dirty is a set, table updates are coalesced: handlers only mark the
+    table, and the server calls flush every broadcast tick to send one patch
+    per changed table. Spectators (watch_game) are sent their own patches
+    by flush(spectators=True), which the server calls less often.
+    """
+
+    def __init__(self, shard=None, history=None):
+        self.shard = shard
+        self.history = history  # Optional HandHistoryWriter shared by every table
+        self.games = {}
+        self.waiting_players = {}  # ✅ Track players waiting for the next game
+        self.sessions = SessionRegistry()  # ✅ sid <-> player name <-> game indexes
+        self.last_game_number = 0  # ✅ Game ids are never reused
+        self.sent_hands = {}  # ✅ Map session IDs to the hole cards last sent to them
+        self.changed = None  # ✅ Ids of tables changed since the last snapshot, once snapshots are on
+        self.connections = 0  # ✅ Connected sids, seated or not
+        self.clock = None  # ✅ Optional TurnClock shared by every table
+        self.dirty = None  # ✅ Tables with unsent changes, once broadcasts are coalesced into ticks
+        self.spectators = {}  # ✅ game_id -> sids watching it
+        self.watching = {}  # ✅ sid -> game_id it watches
+        self.spectator_states = {}  # ✅ game_id -> published state its spectators were last sent
+
+    def mark_changed(self, game_id):
+        if self.changed is not None:
+            self.changed.add(game_id)
+
+    @staticmethod
+    def turn_token(game):
+        """Whose turn it is in which hand and round, or None when nobody is waited on."""
+        player = game.get_current_player()
+        if player is None or game.hand_seed is None or game.waiting_for_players:
+            return None
+        if game.rounds[game.current_round] == "showdown":
+            return None
+        return game.hand_seed, game.current_round, game.current_turn_index, player.name
+
+    def restart_clock(self, game_id):
+        """Restart the table's turn clock if the turn moved, or stop it if nobody is to act."""
+        if self.clock is None:
+            return
+        game = self.games.get(game_id)
+        token = self.turn_token(game) if game else None
+        if token is None:
+            self.clock.cancel(game_id)
+        else:
+            self.clock.schedule(game_id, token)
+
+    @staticmethod
+    def hand_message(game, player):
+        """Private hole cards for their owner, with the preflop equity hint."""
+        return {"hand": serialize_cards(player.hand), "preflop_equity": game.preflop_hint(player)}
+
+    def broadcast_state(self, game_id, out):
+        """Send the table's changes now, or at the next flush when broadcasts are coalesced."""
+        self.restart_clock(game_id)
+        if self.dirty is not None:
+            self.dirty.add(game_id)
+            return
+        self.send_state(game_id, out)
+
+    def send_state(self, game_id, out):
+        """Send what changed at the table to the game's room and new hole cards to their owner's sid."""
+        game = self.games[game_id]
+        patch = game.get_state_patch()
+        if patch:
+            out.append(("emit", "game_state_patch", patch, game_id))
+        for player in game.players:
+            sid = self.sessions.sid_for(game_id, player.name)
+            if sid and player.hand and self.sent_hands.get(sid) is not player.hand:
+                self.sent_hands[sid] = player.hand
+                out.append(("emit", "player_hand", self.hand_message(game, player), sid))
+
+    def send_snapshot(self, sid, game_id, out):
+        """Publish the table's changes now, even when broadcasts are coalesced, then give sid the full state.
+
+        The snapshot must be the published state its later patches build on,
+        so it can't wait for the next flush.
+        """
+        self.restart_clock(game_id)
+        self.send_state(game_id, out)
+        out.append(("enter_room", sid, game_id))  # ✅ Table updates only go to this game's room
+        out.append(("emit", "game_state", self.games[game_id].published_state, sid))
+
+    def flush(self, spectators=False):
+        """Operations for one broadcast tick: a patch for each table changed since the last tick.
+
+        However many actions a table took during the tick, its players get a
+        single patch and each of them at most one new hand. With spectators,
+        every watched table whose published state moved on since its
+        spectators' last update also gets one patch to its watch room, based
+        on the state they were last sent.
+        """
+        out = []
+        while self.dirty:
+            game_id = self.dirty.pop()  # Tables marked while this runs are sent now or next tick, never lost
+            if game_id in self.games:
+                self.send_state(game_id, out)
+        if spectators:
+            for game_id in list(self.spectators):
+                game = self.games.get(game_id)
+                seen = self.spectator_states.get(game_id)
+                if game is None or seen is game.published_state:
+                    continue
+                changes = diff_state(seen, game.published_state)
+                if changes:
+                    patch = {"version": game.state_version, "base": seen["version"], **changes}
+                    out.append(("emit", "game_state_patch", patch, f"watch:{game_id}"))
+                self.spectator_states[game_id] = game.published_state
+        return out
+
+    def game_list(self):
+        """Ids of every table in the lobby, across all workers when sharded."""
+        if self.shard:
+            return self.shard.game_list()
+        return list(self.games.keys())
+
+    def delete_game(self, game_id, out):
+        game = self.games.pop(game_id)
+        if self.history:
+            self.history.table_deleted(game)
+        self.mark_changed(game_id)
+        if self.clock:
+            self.clock.cancel(game_id)
+        self.waiting_players.pop(game_id, None)
+        self.sessions.drop_game(game_id)
+        for sid in self.spectators.pop(game_id, ()):
+            del self.watching[sid]
+        self.spectator_states.pop(game_id, None)
+        if self.shard:
+            self.shard.game_ids.discard(game_id)
+            out.append(("publish", {"deleted": game_id}))
+
+    def connect(self, sid):
+        self.connections += 1
+        return [("emit", "update_games", self.game_list(), sid)]
+
+    def create_game(self, _sid):
+        if self.shard:
+            # Every worker, this one included, announces the table when the queue delivers this
+            game_id = self.shard.allocate()
+            self.games[game_id] = PokerGame(game_id=game_id, history=self.history)
+            self.mark_changed(game_id)
+            return [("publish", {"created": game_id})]
+        self.last_game_number += 1
+        game_id = f"game-{self.last_game_number}"
+        self.games[game_id] = PokerGame(game_id=game_id, history=self.history)
+        self.mark_changed(game_id)
+        return [("emit", "update_games", list(self.games.keys()), None)]
+
+    def lobby_message(self, message):
+        """Apply a created/deleted message from the queue; returns operations for this worker's clients only.
+
+        All workers receive the queue's messages in the same order, so their
+        lobby lists stay identical.
+        """
+        self.shard.apply(message)
+        if "created" in message:
+            return [("emit", "update_games", self.game_list(), None)]
+        return []
+
+    def join_game(self, sid, data):
+        out = []
+        game_id = data['game_id']
+        player_name = data['name']
+
+        if self.shard and not self.shard.owns(game_id):
+            # 🔀 The table lives on another worker; the client reconnects there
+            out.append(("emit", "route", {"game_id": game_id, "url": self.shard.url_for(game_id)}, sid))
+            return out
+
+        watched = self.stop_watching(sid)
+        if watched:
+            out.append(("leave_room", sid, f"watch:{watched}"))  # ✅ Players get the table's full-rate updates
+
+        if game_id in self.games:
+            game = self.games[game_id]
+            self.mark_changed(game_id)
+
+            if game.get_player(player_name):
+                if self.sessions.sid_for(game_id, player_name) is not None:
+                    # ❌ The seat belongs to a connected player; don't let anyone else act for them
+                    out.append(("emit", "join_error", {"message": f"{player_name} is already seated here!"}, sid))
+                    return out
+                # ✅ Seat restored from a snapshot with no client yet (e.g. after a restart): attach the new session
+                self.sessions.register(sid, player_name, game_id)
+                self.send_snapshot(sid, game_id, out)
+                return out
+
+            if player_name in self.waiting_players.get(game_id, ()):
+                out.append(("emit", "join_error", {"message": f"{player_name} is already waiting here!"}, sid))
+                return out
+
+            if game.current_round > 0:
+                if game_id not in self.waiting_players:
+                    self.waiting_players[game_id] = []
+                self.waiting_players[game_id].append(player_name)
+                self.sessions.register(sid, player_name, game_id)  # ✅ Their cards reach them once they're dealt in
+                out.append(("emit", "join_error", {"message": "Game in progress! You'll be added to the next round."}, sid))
+                self.send_snapshot(sid, game_id, out)  # ✅ Watch the table until the next hand
+                return out
+
+            game.add_player(player_name)
+            self.sessions.register(sid, player_name, game_id)  # ✅ Store player's session ID
+            player = game.get_player(player_name)
+
+            # ✅ Ensure player gets hole cards
+            if player and not player.hand:
+                game.deal_hole_cards(player)  # 🎴 Give two hole cards
+
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("🃏 %s joined and received: %s", player_name, format_cards(player.hand))
+
+            # ✅ Tell the table about the new player, then give the newcomer a full snapshot
+            self.send_snapshot(sid, game_id, out)
+        return out
+
+    def watch_game(self, sid, data):
+        """Follow a table as a spectator, with the state its spectators were last sent."""
+        out = []
+        game_id = data.get('game_id')
+        if self.shard and not self.shard.owns(game_id):
+            out.append(("emit", "route", {"game_id": game_id, "url": self.shard.url_for(game_id), "watch": True}, sid))
+            return out
+        if game_id not in self.games:
+            return out
+        watched = self.stop_watching(sid)
+        if watched:
+            out.append(("leave_room", sid, f"watch:{watched}"))
+        if game_id not in self.spectator_states:
+            self.send_state(game_id, out)  # ✅ Publish pending changes first, so spectators start current
+            self.spectator_states[game_id] = self.games[game_id].published_state
+        self.spectators.setdefault(game_id, set()).add(sid)
+        self.watching[sid] = game_id
+        out.append(("enter_room", sid, f"watch:{game_id}"))
+        out.append(("emit", "game_state", self.spectator_states[game_id], sid))
+        return out
+
+    def stop_watching(self, sid):
+        """Forget that sid watches a table; returns the table's id, or None if it watched none."""
+        game_id = self.watching.pop(sid, None)
+        if game_id is not None:
+            spectators = self.spectators[game_id]
+            spectators.discard(sid)
+            if not spectators:
+                del self.spectators[game_id]
+                del self.spectator_states[game_id]
+        return game_id
+
+    def request_state(self, sid, data):
+        """Full resync for a client that missed a state patch version."""
+        out = []
+        game_id = data.get('game_id')
+        if game_id not in self.games:
+            return out
+        if self.watching.get(sid) == game_id:
+            out.append(("emit", "game_state", self.spectator_states[game_id], sid))
+            return out
+        self.send_state(game_id, out)  # ✅ Flush pending changes so the snapshot matches its version
+        game = self.games[game_id]
+        out.append(("emit", "game_state", game.published_state, sid))
+        for player in game.players:
+            if self.sessions.sid_for(game_id, player.name) == sid and player.hand:
+                self.sent_hands[sid] = player.hand
+                out.append(("emit", "player_hand", self.hand_message(game, player), sid))
+        return out
+
+    def player_action(self, _sid, data):
+        out = []
+        log.debug("⚡ Received action: %s", data)
+
+        game_id = data['game_id']
+        if game_id in self.games:
+            game = self.games[game_id]
+            self.mark_changed(game_id)
+            log.debug("✅ Game found, processing action...")
+
+            result = game.process_action(data['name'], data.get('action', ""), data.get('amount', 0))
+            self.restart_clock(game_id)
+
+            if result and result.get("equity"):
+                # 📊 An all-in was run out and the engine already dealt the next hand: announce the runout
+                out.append(("emit", "all_in_result", result, game_id))
+
+            active_players = [p for p in game.players if p.status != FOLDED]
+
+            # 🏆 **Check if only one player remains (Win by fold)**
+            if len(active_players) == 1:
+                winner_data = {"winner": active_players[0].name, "pot": game.pot}
+                out.append(("emit", "game_result", winner_data, game_id))  # ✅ Show winner pop-up
+                log.debug("🎉 Winner announced due to fold: %s", winner_data)
+
+                out.append(("emit", "start_new_game", None, game_id))  # ✅ Restart game after fold
+                return out  # ✅ Prevent further action processing
+
+            # 🏆 **Check if round reached showdown (Normal game end)**
+            if game.rounds[game.current_round] == "showdown":
+                winner_data = {"winner": game.determine_winner(), "pot": game.pot, "pots": game.showdown_pots}
+                out.append(("emit", "game_result", winner_data, game_id))  # ✅ Show winner pop-up
+                log.debug("🎉 Winner announced at showdown: %s", winner_data)
+
+                out.append(("emit", "start_new_game", None, game_id))  # ✅ Restart game after showdown
+                return out  # ✅ Prevent further action processing
+
+            # 🔄 **Ensure UI refreshes properly during normal play**
+            self.broadcast_state(game_id, out)
+        return out
+
+    def turn_expired(self, game_id, token):
+        """Act for a player whose turn clock ran out: check if that is free, fold otherwise."""
+        game = self.games.get(game_id)
+        if game is None or self.turn_token(game) != token:
+            return []  # Acted just as the clock ran out
+        player = game.get_current_player()
+        action = "call" if player.bet_amount >= game.highest_bet else "fold"
+        log.info("⏰ %s ran out of time at %s: %s", player.name, game_id, "check" if action == "call" else "fold")
+        return self.player_action(None, {"game_id": game_id, "name": player.name, "action": action})
+
+    def start_new_game(self, _sid, data=None):
+        out = []
+        if not self.games:  # ✅ Nothing to fall back on
+            log.debug("❌ No active games, skipping new game start.")
+            return out
+
+        game_id = (data or {}).get('game_id')
+        if game_id not in self.games:
+            game_id = next(reversed(self.games))  # Keep latest game: ids grow and dicts keep creation order
+        game = self.games[game_id]
+        self.mark_changed(game_id)
+
+        # ✅ Seat waiting players from queue first, so the new hand deals them in
+        if game_id in self.waiting_players:
+            for player_name in self.waiting_players[game_id]:
+                game.add_player(player_name)
+                log.debug("✅ Queued player %s added to new game.", player_name)
+
+            self.waiting_players[game_id] = []  # ✅ Clear queue after players are added
+
+        game.start_game()  # 🔄 Reset the game state
+
+        self.broadcast_state(game_id, out)  # ✅ Broadcast fresh game state to the table
+        log.debug("♻️ New round started with queued + existing players!")
+        return out
+
+    def leave_game(self, sid, data):
+        out = []
+        game_id = data['game_id']
+        player_name = data['name']
+
+        if game_id in self.games:
+            game = self.games[game_id]
+            self.mark_changed(game_id)
+            game.remove_player(player_name)
+            self._unqueue(game_id, player_name)
+            self.sessions.drop_seat(game_id, player_name)
+            out.append(("leave_room", sid, game_id))
+
+            # ✅ If no players remain, delete the game and notify clients
+            if not game.players:
+                self.delete_game(game_id, out)
+                log.info("♻️ Game %s removed since no players remain.", game_id)
+                out.append(("emit", "game_deleted", {"game_id": game_id}, None))  # ✅ Notify UI to remove game
+            else:
+                self.broadcast_state(game_id, out)  # ✅ Only emit if game still exists
+        else:
+            log.info("⚠️ Attempted to leave non-existent game %s.", game_id)
+        return out
+
+    def _unqueue(self, game_id, player_name):
+        """Take a player off the table's queue for the next hand, if they were waiting."""
+        waiting = self.waiting_players.get(game_id)
+        if waiting and player_name in waiting:
+            waiting.remove(player_name)
+
+    def disconnect(self, sid):
+        out = []
+        self.connections -= 1
+        self.sent_hands.pop(sid, None)
+        self.stop_watching(sid)
+
+        # ✅ Find the player and their game by session ID, removing the session
+        entry = self.sessions.drop_sid(sid)
+        if not entry:
+            log.debug("❌ Unknown session disconnected: %s", sid)
+            return out
+        disconnected_player, game_id = entry
+
+        self._unqueue(game_id, disconnected_player)
+        game = self.games.get(game_id)
+        if game and game.get_player(disconnected_player):
+            self.mark_changed(game_id)
+            game.remove_player(disconnected_player)
+            log.info("❌ %s disconnected and removed from %s", disconnected_player, game_id)
+
+            # ✅ If the disconnected player was up next, advance turn
+            if game.get_current_player() and game.get_current_player().name == disconnected_player:
+                game.next_turn()
+
+            # ✅ If only one player remains, declare winner
+            active_players = [p for p in game.players if p.status != FOLDED]
+            if len(active_players) == 1:
+                winner = active_players[0]
+                winner.award_winnings(game.pot)
+                out.append(("emit", "game_result", {"winner": winner.name, "pot": game.pot}, game_id))
+                out.append(("emit", "game_state", game.get_state(include_hands=False), game_id))
+                self.delete_game(game_id, out)
+                return out
+
+            self.broadcast_state(game_id, out)
+        return out
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+
+async def serve_hub(host="127.0.0.1", port=5555):
+    """Minimal local-socket message queue: every JSON line received goes to every connection.
+
+    A stand-in for Redis or another broker when running sharded workers on one
+    machine or in tests.
+    """
+    connections = set()
+
+    async def relay(reader, writer):
+        connections.add(writer)
+        try:
+            while line := await reader.readline():
+                for connection in list(connections):
+                    connection.write(line)
+        finally:
+            connections.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_server(relay, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def run_hub(host="127.0.0.1", port=5555):
+    asyncio.run(serve_hub(host, port))
+
+
+class HubManager(AsyncPubSubManager):
+    """Socket.IO client manager that shares only lobby traffic between workers.
+
+    Emits addressed to the whole namespace (such as game_deleted) go over
+    the hub to every worker's clients. Emits to a room or sid stay
+    local, since sticky routing keeps a table and all of its clients on one
+    worker; that keeps per-action traffic off the queue so workers scale
+    independently. Lobby directory messages sent with publish_lobby are
+    passed to on_lobby on every worker, the sender included, in the order
+    the hub relayed them.
+    """
+
+    name = "hub"
+
+    def __init__(self, host="127.0.0.1", port=5555, on_lobby=None, channel="socketio"):
+        super().__init__(channel=channel)
+        self.address = (host, port)
+        self.on_lobby = on_lobby
+        self.writer = None
+        self.connected = asyncio.Event()
+
+    async def emit(self, event, data, namespace=None, room=None, skip_sid=None,
+                   callback=None, to=None, **kwargs):
+        if (to or room) is not None:
+            kwargs["ignore_queue"] = True
+        return await super().emit(event, data, namespace=namespace, room=room, skip_sid=skip_sid,
+                                  callback=callback, to=to, **kwargs)
+
+    async def publish_lobby(self, message):
+        await self._publish({"method": "lobby", "host_id": self.host_id, **message})
+
+    async def _publish(self, data):
+        await self.connected.wait()
+        self.writer.write(json.dumps({"channel": self.channel, **data}).encode() + b"\n")
+        await self.writer.drain()
+
+    async def _listen(self):
+        reader, self.writer = await asyncio.open_connection(*self.address)
+        self.connected.set()
+        while line := await reader.readline():
+            message = json.loads(line)
+            if message.pop("channel") != self.channel:
+                continue
+            if message["method"] == "lobby":
+                if self.on_lobby:
+                    await self.on_lobby(message)
+                continue
+            yield message
@@ -0,0 +1,123 @@
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from poker.equity import equity_cache
+
+# Histogram bucket upper bounds in seconds, from 50 us to 2.5 s
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """Counts of observed durations per bucket, plus their sum and count.
+
+    Observing is one bisect and three additions; cumulative bucket counts are
+    only worked out when the metrics are rendered. The lock keeps concurrent
+    handler threads from losing each other's updates.
+    """
+
+    __slots__ = ("counts", "total", "count", "lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # The last bucket is +Inf
+        self.total = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        bucket = bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.counts[bucket] += 1
+            self.total += seconds
+            self.count += 1
+
+    def snapshot(self):
+        """Consistent (counts, total, count) for rendering."""
+        with self.lock:
+            return list(self.counts), self.total, self.count
+
+
+def _labels(labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels)
+
+
+class Metrics:
+    """Timing histograms and gauges of one process, rendered in Prometheus text format.
+
+    Histograms are grouped into families sharing a name and help text, one
+    histogram per label set. Gauges are read from a callback when rendered,
+    so nothing has to be updated as tables and connections come and go.
+    """
+
+    def __init__(self):
+        self.families = {}  # name -> (help, {label tuple: Histogram})
+        self.gauges = {}  # name -> (help, type, read)
+
+    def histogram(self, name, help_text, **labels):
+        """The histogram of a family for these labels, created on first use."""
+        family = self.families.setdefault(name, (help_text, {}))[1]
+        key = tuple(sorted(labels.items()))
+        if key not in family:
+            family[key] = Histogram()
+        return family[key]
+
+    def gauge(self, name, help_text, read, kind="gauge"):
+        """Register (or replace) a value read() at render time; kind "counter" for running totals."""
+        self.gauges[name] = (help_text, kind, read)
+
+    def render(self):
+        lines = []
+        for name, (help_text, family) in self.families.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for key, histogram in family.items():
+                counts, total, observed = histogram.snapshot()
+                labels = _labels(key)
+                prefix = labels + "," if labels else ""
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                suffix = f"{{{labels}}}" if labels else ""
+                lines.append(f"{name}_sum{suffix} {total}")
+                lines.append(f"{name}_count{suffix} {observed}")
+        for name, (help_text, kind, read) in self.gauges.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {read()}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()  # Shared by everything in the process
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+EVENT_SECONDS = "poker_event_seconds"
+EVENT_HELP = "Time to handle a Socket.IO event, sending its messages included."
+
+
+def timed(name, help_text, **labels):
+    """Decorator recording each call's duration in a histogram of metrics."""
+    histogram = metrics.histogram(name, help_text, **labels)
+
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def register_lobby(lobby):
+    """Gauges for a lobby's tables, connected sessions, waiting players and the equity cache."""
+    metrics.gauge("poker_tables", "Tables in the lobby.", lambda: len(lobby.games))
+    metrics.gauge("poker_connected_sids", "Connected Socket.IO sessions.", lambda: lobby.connections)
+    metrics.gauge("poker_waiting_players", "Players queued for the next hand.",
+                  lambda: sum(len(names) for names in lobby.waiting_players.values()))
+    metrics.gauge("poker_spectators", "Connections watching a table.", lambda: len(lobby.watching))
+    metrics.gauge("poker_turn_clocks", "Tables waiting on a player's turn clock.",
+                  lambda: len(lobby.clock.pending) if lobby.clock else 0)
+    metrics.gauge("poker_equity_cache_entries", "Deals in the all-in equity cache.", lambda: len(equity_cache.entries))
+    metrics.gauge("poker_equity_cache_hits_total", "All-in equity cache hits.", lambda: equity_cache.hits, "counter")
+    metrics.gauge("poker_equity_cache_misses_total", "All-in equity cache misses.", lambda: equity_cache.misses,
+                  "counter")
@@ -1,22 +1,38 @@
+import logging
+
+log = logging.getLogger(__name__)
+
+# Player status codes; the engine compares these small ints in its hot loops
+ACTIVE, FOLDED, ALL_IN = 0, 1, 2
+STATUS_NAMES = ("active", "folded", "all-in")  # Wire names, indexed by status code
+
+
 class Player:
+    __slots__ = ("name", "chips", "hand", "status", "has_acted", "bet_amount")
+
     def __init__(self, name):
         self.name = name
         self.chips = 1000
         self.hand = []
-        self.status = "active"
+        self.status = ACTIVE
         self.has_acted = False
         self.bet_amount = 0  # Track the current bet amount
 
+    @property
+    def status_name(self):
+        """The status as the frontend knows it: "active", "folded" or "all-in"."""
+        return STATUS_NAMES[self.status]
+
     def reset_for_new_game(self):
         """Reset player state for a new hand."""
-        self.status = "active"
+        self.status = ACTIVE
         self.hand = []
         self.has_acted = False
         self.bet_amount = 0  # Reset bet amount
 
     def fold(self):
         """Marks the player as folded for this round."""
-        self.status = "folded"
+        self.status = FOLDED
         self.has_acted = True
 
     def bet(self, amount):
@@ -26,9 +42,9 @@ class Player:
             actual_bet = self.chips
             self.bet_amount += actual_bet
             self.chips = 0
-            self.status = "all-in"
+            self.status = ALL_IN
             self.has_acted = True
-            print(f"⚡ {self.name} goes all-in with {actual_bet} chips!")
+            log.debug("⚡ %s goes all-in with %s chips!", self.name, actual_bet)
             return actual_bet
         else:
             self.chips -= amount
@@ -40,8 +56,8 @@ class Player:
         """Credit winnings to the player's balance, handling split pots."""
         self.chips += amount
         self.bet_amount = 0  # Reset bet amount after winnings are awarded
-        print(f"💰 {self.name} received {amount} chips! New balance: {self.chips}")
+        log.debug("💰 %s received %s chips! New balance: %s", self.name, amount, self.chips)
 
     def __repr__(self):
         """Provides a cleaner string representation for debugging."""
-        return f"Player({self.name}, Chips: {self.chips}, Status: {self.status}, Bet: {self.bet_amount})"
+        return f"Player({self.name}, Chips: {self.chips}, Status: {self.status_name}, Bet: {self.bet_amount})"
@@ -0,0 +1,195 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+
+from poker.deck import deal_batch, ranks
+from poker.hand_evaluator import evaluate_many
+
+# File layout: header, then float32 equities vs 1-5 random opponents (169 x 5), then the
+# heads-up class-vs-class matrix (169 x 169), row hand's equity against the column hand
+HEADER = struct.Struct("<4sHHII")  # magic, version, max opponents, samples per class, boards
+FLOAT = struct.Struct("<f")
+MAGIC = b"PFEQ"
+MAX_OPPONENTS = 5
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "preflop_equity.bin")
+
+# Every two-card combination, and the canonical class of each: 13 x 13 grid indexed
+# high rank * 13 + low rank for suited hands and pairs, low rank * 13 + high rank offsuit
+COMBOS = np.array([(a, b) for a in range(52) for b in range(a + 1, 52)], dtype=np.intp)
+
+
+def _class_of(a, b):
+    high, low = max(a >> 2, b >> 2), min(a >> 2, b >> 2)
+    return high * 13 + low if (a & 3) == (b & 3) or high == low else low * 13 + high
+
+
+CLASS_OF_CARDS = bytes(_class_of(a, b) if a != b else 0 for a in range(52) for b in range(52))
+COMBO_CLASSES = np.array([_class_of(a, b) for a, b in COMBOS], dtype=np.intp)
+
+
+def hand_class(hand):
+    """Canonical starting-hand index 0-168 of two integer hole cards."""
+    return CLASS_OF_CARDS[hand[0] * 52 + hand[1]]
+
+
+def class_name(index):
+    """Short name of a starting-hand index, such as "AKs", "T9o" or "77"."""
+    first, second = divmod(index, 13)
+    names = [rank if rank != "10" else "T" for rank in ranks]
+    if first == second:
+        return names[first] * 2
+    if first > second:
+        return names[first] + names[second] + "s"
+    return names[second] + names[first] + "o"
+
+
+def _representative(index):
+    """One hole-card combination of a class; equities against random hands are the same for all of them."""
+    return COMBOS[np.argmax(COMBO_CLASSES == index)]
+
+
+def _scores(holes, boards):
+    """Seven-card scores of every hole (rows x 2) with the matching board (rows x 5)."""
+    return evaluate_many(np.hstack([holes, boards]), chunk_size=None)
+
+
+def _multiway(index, samples, seed):
+    """Equity of one class against 1..MAX_OPPONENTS random hands, ties split evenly."""
+    rng = np.random.default_rng(seed)
+    hole = _representative(index)
+    equities = []
+    for opponents in range(1, MAX_OPPONENTS + 1):
+        deals = deal_batch(samples, 2 * opponents + 5, rng, dead=hole)
+        boards = deals[:, -5:]
+        scores = np.empty((samples, opponents + 1), dtype=np.int32)
+        scores[:, 0] = _scores(np.broadcast_to(hole, (samples, 2)), boards)
+        for seat in range(opponents):
+            scores[:, seat + 1] = _scores(deals[:, 2 * seat:2 * seat + 2], boards)
+        winners = scores == np.max(scores, axis=1, keepdims=True)
+        equities.append(float(np.mean(winners[:, 0] / np.count_nonzero(winners, axis=1))))
+    return equities
+
+
+def _heads_up(boards, seed):
+    """Sum every combination's heads-up results against every other over random boards.
+
+    Each board scores all 1326 combinations at once and then settles all
+    1326 x 1326 matchups with one comparison, so a board gives a result for
+    every pair of classes. Returns (half_points, counts): two half points for
+    a win and one for a tie, counted only where neither hand uses a board card.
+    """
+    rng = np.random.default_rng(seed)
+    masks = (np.int64(1) << COMBOS[:, 0]) | (np.int64(1) << COMBOS[:, 1])
+    half_points = np.zeros((len(COMBOS), len(COMBOS)), dtype=np.int32)
+    counts = np.zeros((len(COMBOS), len(COMBOS)), dtype=np.int32)
+    for board in deal_batch(boards, 5, rng):
+        valid = (masks & np.bitwise_or.reduce(np.int64(1) << board)) == 0
+        scores = np.full(len(COMBOS), -1, dtype=np.int32)
+        scores[valid] = _scores(COMBOS[valid], np.broadcast_to(board, (np.count_nonzero(valid), 5)))
+        both = valid[:, None] & valid[None, :]
+        half_points += both * ((scores[:, None] > scores[None, :]).view(np.int8)
+                               + (scores[:, None] >= scores[None, :]).view(np.int8))
+        counts += both
+    return half_points, counts
+
+
+def build(path=DEFAULT_PATH, samples=20000, boards=5000, workers=None, seed=None):
+    """Compute both tables and write them to path.
+
+    The defaults take about a minute and a half of CPU time, spread over
+    workers processes: roughly 0.35% standard error on the multiway
+    equities, and much less per heads-up class matchup.
+    """
+    streams = np.random.SeedSequence(seed).spawn(169 + (workers or os.cpu_count() or 1))
+    chunks = len(streams) - 169
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        multiway = pool.map(_multiway, range(169), [samples] * 169, streams[:169])
+        parts = pool.map(_heads_up, [boards // chunks + (i < boards % chunks) for i in range(chunks)], streams[169:])
+        multiway = np.array(list(multiway), dtype=np.float32)
+        half_points, counts = 0, 0
+        for part_points, part_counts in parts:
+            half_points, counts = half_points + part_points, counts + part_counts
+
+    # Combinations sharing a card never meet; then pool combinations into classes
+    masks = (np.int64(1) << COMBOS[:, 0]) | (np.int64(1) << COMBOS[:, 1])
+    disjoint = (masks[:, None] & masks[None, :]) == 0
+    members = np.zeros((169, len(COMBOS)))
+    members[COMBO_CLASSES, np.arange(len(COMBOS))] = 1
+    heads_up = (members @ (half_points * disjoint) @ members.T) / (2 * members @ (counts * disjoint) @ members.T)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as handle:
+        handle.write(HEADER.pack(MAGIC, 1, MAX_OPPONENTS, samples, boards))
+        handle.write(multiway.tobytes())
+        handle.write(heads_up.astype(np.float32).tobytes())
+    os.replace(temporary, path)
+
+
+class PreflopTable:
+    """Memory-mapped preflop equities; a lookup is one index computation and one read.
+
+    The file is mapped read-only, so processes serving tables share one copy
+    of it through the page cache and nothing is read until first used.
+    multiway and heads_up are numpy views of the mapping for bulk use.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        with open(path, "rb") as handle:
+            self.mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_opponents, self.samples, self.boards = HEADER.unpack_from(self.mapping)
+        if magic != MAGIC or version != 1:
+            raise ValueError(f"{path} is not a preflop equity table")
+        self.heads_up_offset = HEADER.size + 169 * self.max_opponents * FLOAT.size
+        self.multiway = np.frombuffer(self.mapping, np.float32, 169 * self.max_opponents, HEADER.size)
+        self.multiway = self.multiway.reshape(169, self.max_opponents)
+        self.heads_up = np.frombuffer(self.mapping, np.float32, 169 * 169, self.heads_up_offset).reshape(169, 169)
+        # The multiway block is only 845 values and is read on every state broadcast: keep it as Python floats
+        self.multiway_values = [round(float(value), 4) for value in self.multiway.ravel()]
+
+    def equity(self, hand, opponents=1):
+        """All-in equity of two integer hole cards against 1-5 random hands."""
+        index = hand_class(hand) * self.max_opponents + min(max(opponents, 1), self.max_opponents) - 1
+        return self.multiway_values[index]
+
+    def versus(self, hand, other):
+        """Heads-up equity of one starting hand against another's class."""
+        index = hand_class(hand) * 169 + hand_class(other)
+        return FLOAT.unpack_from(self.mapping, self.heads_up_offset + index * FLOAT.size)[0]
+
+
+_default = SimpleNamespace(table=None)  # The table at DEFAULT_PATH once looked for, False if it is not built
+
+
+def preflop_equity(hand, opponents=1):
+    """Equity from the built table at DEFAULT_PATH, or None when it has not been built."""
+    if _default.table is None:
+        _default.table = PreflopTable() if os.path.exists(DEFAULT_PATH) else False
+    return _default.table.equity(hand, opponents) if _default.table and len(hand) == 2 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mapped preflop equity tables.")
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    parser.add_argument("--samples", type=int, default=20000, help="random deals per class and opponent count")
+    parser.add_argument("--boards", type=int, default=5000, help="random boards for the heads-up matrix")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build(args.output, args.samples, args.boards, args.workers, args.seed)
+    table = PreflopTable(args.output)
+    aces, seven_deuce = (51, 50), (20, 1)
+    print(f"📊 Built {args.output} in {time.perf_counter() - start:.1f}s: "
+          f"AA {table.equity(aces):.3f} heads-up, {table.equity(aces, 5):.3f} vs 5; "
+          f"72o {table.equity(seven_deuce):.3f}; AA vs 72o {table.versus(aces, seven_deuce):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+class SessionRegistry:
+    """Indexes between connected sids, seated player names and their tables.
+
+    by_sid maps sid -> (name, game_id), by_seat maps (game_id, name) -> sid
+    and by_game maps game_id -> set of names, so every lookup on join, leave,
+    disconnect and table deletion is O(1) instead of a scan over sessions or
+    tables. Seats are keyed by table as well as name, since players at
+    different tables may share a name.
+    """
+
+    def __init__(self):
+        self.by_sid = {}
+        self.by_seat = {}
+        self.by_game = {}
+
+    def register(self, sid, name, game_id):
+        """Record that sid is playing as name at game_id, replacing older entries for either."""
+        self.drop_seat(game_id, name)
+        self.drop_sid(sid)
+        self.by_sid[sid] = (name, game_id)
+        self.by_seat[game_id, name] = sid
+        self.by_game.setdefault(game_id, set()).add(name)
+
+    def sid_for(self, game_id, name):
+        return self.by_seat.get((game_id, name))
+
+    def drop_sid(self, sid):
+        """Forget a session; returns its (name, game_id), or None if it had no seat."""
+        entry = self.by_sid.pop(sid, None)
+        if entry:
+            name, game_id = entry
+            del self.by_seat[game_id, name]
+            names = self.by_game[game_id]
+            names.discard(name)
+            if not names:
+                del self.by_game[game_id]
+        return entry
+
+    def drop_seat(self, game_id, name):
+        sid = self.by_seat.get((game_id, name))
+        return self.drop_sid(sid) if sid is not None else None
+
+    def drop_game(self, game_id):
+        """Forget every session seated at a deleted table."""
+        for name in list(self.by_game.get(game_id, ())):
+            self.drop_seat(game_id, name)
+
+    def clear(self):
+        self.by_sid.clear()
+        self.by_seat.clear()
+        self.by_game.clear()
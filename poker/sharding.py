@@ -0,0 +1,47 @@
+import zlib
+
+
+def shard_for(game_id, shards):
+    """The worker that owns a table: a stable hash of its id, the same in every process."""
+    return zlib.crc32(game_id.encode()) % shards
+
+
+class Shard:
+    """One worker's view of a sharded deployment.
+
+    urls lists every worker's public base URL in shard order. The worker owns
+    the tables whose ids hash to index and hands out new ids only from those,
+    so workers never need to agree on ids. game_ids is the lobby directory
+    of every table in the deployment, kept current by the created/deleted
+    messages the workers exchange over the message queue.
+    """
+
+    def __init__(self, index, urls):
+        self.index = index
+        self.urls = urls
+        self.game_ids = set()
+        self.last_number = 0
+
+    def owns(self, game_id):
+        return shard_for(game_id, len(self.urls)) == self.index
+
+    def url_for(self, game_id):
+        return self.urls[shard_for(game_id, len(self.urls))]
+
+    def allocate(self):
+        """Next game id that hashes to this worker; only this worker ever issues it."""
+        while True:
+            self.last_number += 1
+            game_id = f"game-{self.last_number}"
+            if self.owns(game_id):
+                return game_id
+
+    def game_list(self):
+        return sorted(self.game_ids, key=lambda x: int(x.split("-")[-1]))
+
+    def apply(self, message):
+        """Update the directory from a lobby message off the queue."""
+        if "created" in message:
+            self.game_ids.add(message["created"])
+        if "deleted" in message:
+            self.game_ids.discard(message["deleted"])
@@ -0,0 +1,50 @@
+from poker.hand_evaluator import hand_category
+
+
+def build_pots(contributions, live, dead_money=0):
+    """Split a hand's bets into the main pot and side pots in one sorted pass.
+
+    contributions maps each player name to the chips they put in this hand, in
+    seat order; live is the set of names that have not folded. dead_money
+    (bets of players who left) goes into the main pot. Returns a list of
+    {"amount", "eligible"} dicts, main pot first, with eligible names in seat
+    order. Layers nobody live can contest are folded into the pot below them.
+    """
+    seat = {name: index for index, name in enumerate(contributions)}
+    ordered = sorted((amount, seat[name], name) for name, amount in contributions.items() if amount > 0)
+    contenders = [name for name in contributions if name in live and contributions[name] > 0]
+    everyone_live = [name for name in contributions if name in live]
+    pots = []
+    previous = 0
+    for index, (amount, _, name) in enumerate(ordered):
+        if amount > previous:
+            size = (amount - previous) * (len(ordered) - index)
+            if pots and (not contenders or pots[-1]["eligible"] == contenders):
+                pots[-1]["amount"] += size
+            else:
+                pots.append({"amount": size, "eligible": list(contenders) or everyone_live})
+            previous = amount
+        if name in live:
+            contenders.remove(name)
+    if not pots:
+        pots.append({"amount": 0, "eligible": everyone_live})
+    pots[0]["amount"] += dead_money
+    return pots
+
+
+def settle_pots(pots, scores):
+    """Fill in each pot's winners from hand scores computed once per live player.
+
+    Adds "winners", "share" (chips per winner), "odd_chips" and "odd_chip_to"
+    (the first winner in seat order takes any remainder) and the winning
+    "hand" name to every pot, and returns the pots.
+    """
+    for pot in pots:
+        best = max(scores[name] for name in pot["eligible"])
+        winners = [name for name in pot["eligible"] if scores[name] == best]
+        pot["winners"] = winners
+        pot["share"] = pot["amount"] // len(winners)
+        pot["odd_chips"] = pot["amount"] % len(winners)
+        pot["odd_chip_to"] = winners[0] if pot["odd_chips"] else None
+        pot["hand"] = hand_category(best)
+    return pots
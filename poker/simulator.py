@@ -0,0 +1,173 @@
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from poker.game import PokerGame
+from poker.history import HandHistoryWriter
+
+MAX_ACTIONS_PER_HAND = 1000
+
+
+def to_call(game, player):
+    """Chips the player must add to match the highest live bet."""
+    return max(0, game.highest_bet - player.bet_amount)
+
+
+def always_call(_game, _player, _rng):
+    """Calling station: never folds, never raises."""
+    return "call", 0
+
+
+def random_player(game, player, rng):
+    """Folds, calls or raises at random, folding less when checking is free."""
+    roll = rng.random()
+    if roll < 0.15 and to_call(game, player):
+        return "fold", 0
+    if roll > 0.85:
+        return "raise", game.big_blind_amount * rng.randint(1, 4)
+    return "call", 0
+
+
+def tight_aggressive(game, player, _rng):
+    """Raises strong starting hands, calls playable ones and folds the rest to a bet."""
+    high, low = sorted((card >> 2 for card in player.hand), reverse=True)
+    if high == low and high >= 8 or high == 12 and low >= 9:
+        return "raise", game.big_blind_amount * 3
+    if high == low or high >= 10 or not to_call(game, player):
+        return "call", 0
+    return "fold", 0
+
+
+def _play_hand(game, strategies, rng, stats):
+    """Drive one hand to completion; the engine deals the next hand itself."""
+    for _ in range(MAX_ACTIONS_PER_HAND):
+        player = game.get_current_player()
+        action, amount = strategies[player.name](game, player, rng)
+        result = game.process_action(player.name, action, amount)
+        stats["actions"] += 1
+        if result is not None:
+            stats["pot_volume"] += result["pot"]
+            if "equity" in result:
+                stats["showdowns"] += 1
+            return
+        if game.rounds[game.current_round] == "showdown":
+            stats["pot_volume"] += game.pot
+            stats["showdowns"] += 1
+            game.determine_winner()
+            game.start_game()
+            return
+    raise RuntimeError(f"hand did not finish within {MAX_ACTIONS_PER_HAND} actions")
+
+
+def play_table(strategies, hands, seed=None, starting_chips=1000, history_dir=None, history_prefix="hands-",
+               debug=False):
+    """Play hands at one table of (name, strategy) seats without any output.
+
+    A strategy is a picklable callable strategy(game, player, rng) returning an
+    (action, amount) pair for PokerGame.process_action. Whenever the table
+    breaks (fewer than two players with chips) a fresh session starts with
+    everyone back at starting_chips; net chips are accumulated per seat, and
+    each session must end with as many chips as it started with. With debug,
+    the engine also cross-checks its bookkeeping and pot after every action.
+    With history_dir, every hand is recorded there as a hand-history log.
+    """
+    rng = random.Random(seed)
+    history = HandHistoryWriter(history_dir, history_prefix) if history_dir else None
+    by_name = dict(strategies)
+    stats = {
+        "hands": 0, "actions": 0, "showdowns": 0, "sessions": 0, "pot_volume": 0,
+        "net": {name: 0 for name in by_name},
+    }
+    start = time.perf_counter()
+    while stats["hands"] < hands:
+        game = PokerGame(rng=rng, compute_equity=False, debug=debug, history=history)
+        for name in by_name:
+            game.add_player(name)
+            game.get_player(name).chips = starting_chips
+        seats = list(game.players)
+        game.start_game()
+        stats["sessions"] += 1
+        while stats["hands"] < hands and not game.waiting_for_players:
+            _play_hand(game, by_name, rng, stats)
+            stats["hands"] += 1
+        # Blinds already posted for an unplayed hand go back to their owners
+        dealt_in = [] if game.waiting_for_players else game.players
+        session = {player.name: player.chips + (player.bet_amount if player in dealt_in else 0) - starting_chips
+                   for player in seats}
+        assert sum(session.values()) == 0, f"chips not conserved over a session: {session}"
+        for name, chips in session.items():
+            stats["net"][name] += chips
+    if history:
+        history.close()
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+def _merge(results, elapsed):
+    total = {"hands": 0, "actions": 0, "showdowns": 0, "sessions": 0, "pot_volume": 0, "net": {}}
+    for stats in results:
+        for key in ("hands", "actions", "showdowns", "sessions", "pot_volume"):
+            total[key] += stats[key]
+        for name, chips in stats["net"].items():
+            total["net"][name] = total["net"].get(name, 0) + chips
+    total["tables"] = len(results)
+    total["elapsed"] = elapsed
+    total["hands_per_sec"] = total["hands"] / elapsed if elapsed else 0.0
+    total["average_pot"] = total["pot_volume"] / total["hands"] if total["hands"] else 0.0
+    return total
+
+
+def simulate(strategies, hands, tables=1, workers=None, seed=None, starting_chips=1000, history_dir=None,
+             debug=False):
+    """Play hands at each of several independent tables, spread over processes.
+
+    Each table gets its own seed spawned from seed, so a seeded run deals the
+    same cards no matter how tables are scheduled. Returns merged statistics
+    including hands_per_sec and per-seat net chips. With history_dir, each
+    table writes its own hand-history segments there; debug is passed on to play_table.
+    """
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(tables)]
+    jobs = [(strategies, hands, table_seed, starting_chips, history_dir, f"table{index:03d}-", debug)
+            for index, table_seed in enumerate(seeds)]
+    start = time.perf_counter()
+    if workers == 1 or tables == 1:
+        results = [play_table(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(play_table, *job) for job in jobs]
+            results = [future.result() for future in futures]
+    return _merge(results, time.perf_counter() - start)
+
+
+STRATEGIES = {
+    "call": always_call,
+    "random": random_player,
+    "tag": tight_aggressive,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless poker simulation.")
+    parser.add_argument("--hands", type=int, default=10000, help="hands per table")
+    parser.add_argument("--tables", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--seats", nargs="+", default=["tag", "random", "call"], choices=sorted(STRATEGIES))
+    parser.add_argument("--history", help="record every hand as hand-history segments in this directory")
+    parser.add_argument("--debug", action="store_true", help="check the engine's bookkeeping and pot after every action")
+    args = parser.parse_args()
+
+    seats = [(f"{name}-{i}", STRATEGIES[name]) for i, name in enumerate(args.seats)]
+    stats = simulate(seats, args.hands, args.tables, args.workers, args.seed, history_dir=args.history,
+                     debug=args.debug)
+    print(f"{stats['hands']} hands on {stats['tables']} table(s) in {stats['elapsed']:.2f}s "
+          f"({stats['hands_per_sec']:.0f} hands/sec), average pot {stats['average_pot']:.1f}")
+    for name, chips in sorted(stats["net"].items(), key=lambda item: -item[1]):
+        print(f"  {name}: {chips:+d} chips")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import json
+import os
+import struct
+from array import array
+
+from poker.deck import Deck, HandStream
+from poker.game import PokerGame
+from poker.player import Player
+
+# Snapshot log entry: key length, body length, then the key and the body.
+# The key is a game id, or "" for the lobby itself; an empty body deletes the table.
+ENTRY = struct.Struct("<HI")
+LOBBY = struct.Struct("<Q")  # last_game_number
+# Table: hand seed (+ present flag), pot, forfeited bets, round, turn, dealer, blind seats, waiting
+# flag, blind amounts, minimum bet, state version, deck (remaining, stream state + present flag,
+# card order), board size and cards, player and queued player counts, length of the JSON extras
+TABLE = struct.Struct("<QBqqBBBBBBqqqQBQB52sB5bBBI")
+PLAYER = struct.Struct("<qqBBB2bH")  # chips, bet, status, has_acted, hand size, hand, name length
+NAME = struct.Struct("<H")
+
+
+def _name(value):
+    encoded = value.encode("utf-8")
+    return NAME.pack(len(encoded)) + encoded
+
+
+def encode_table(game, waiting=()):
+    """Pack a table, its deck order and its queued players into bytes."""
+    deck = game.deck
+    stream = deck.rng if isinstance(deck.rng, HandStream) else None
+    board = list(game.community_cards) + [-1] * (5 - len(game.community_cards))
+    extras = b""
+    if game.all_in_equity is not None or game.showdown_pots is not None:
+        extras = json.dumps([game.all_in_equity, game.showdown_pots]).encode("utf-8")
+    parts = [TABLE.pack(
+        game.hand_seed or 0, game.hand_seed is not None, game.pot, game.forfeited_bets,
+        game.current_round, game.current_turn_index, game.dealer_index, game.small_blind_index,
+        game.big_blind_index, game.waiting_for_players, game.small_blind_amount, game.big_blind_amount,
+        game.minimum_bet, game.state_version, deck.remaining, stream.state if stream else 0, stream is not None,
+        deck.cards.tobytes(), len(game.community_cards), *board, len(game.players), len(waiting), len(extras),
+    )]
+    for player in game.players:
+        hand = list(player.hand) + [-1] * (2 - len(player.hand))
+        name = player.name.encode("utf-8")
+        parts.append(PLAYER.pack(player.chips, player.bet_amount, player.status, player.has_acted,
+                                 len(player.hand), *hand, len(name)))
+        parts.append(name)
+    parts.extend(_name(name) for name in waiting)
+    parts.append(extras)
+    return b"".join(parts)
+
+
+def decode_table(body, game_id=None, history=None):
+    """Rebuild a PokerGame from encode_table's bytes; returns (game, queued player names)."""
+    (seed, has_seed, pot, forfeited, current_round, turn, dealer, small_blind_index, big_blind_index,
+     waiting_flag, small_blind, big_blind, minimum_bet, version, remaining, stream_state, has_stream, cards,
+     board_size, *rest) = TABLE.unpack_from(body)
+    board, (player_count, waiting_count, extras_size) = rest[:5], rest[5:]
+    game = PokerGame(game_id=game_id, history=history)
+    game.hand_seed = seed if has_seed else None
+    game.pot, game.forfeited_bets = pot, forfeited
+    game.current_round, game.current_turn_index, game.dealer_index = current_round, turn, dealer
+    game.small_blind_index, game.big_blind_index = small_blind_index, big_blind_index
+    game.waiting_for_players = bool(waiting_flag)
+    game.small_blind_amount, game.big_blind_amount, game.minimum_bet = small_blind, big_blind, minimum_bet
+    game.state_version = version
+    game.deck = Deck(HandStream(stream_state) if has_stream else game.rng)
+    game.deck.cards = array('b', cards)
+    game.deck.remaining = remaining
+    game.community_cards = list(board[:board_size])
+
+    offset = TABLE.size
+    for _ in range(player_count):
+        chips, bet_amount, status, has_acted, hand_size, first, second, name_size = PLAYER.unpack_from(body, offset)
+        offset += PLAYER.size
+        player = Player(body[offset:offset + name_size].decode("utf-8"))
+        offset += name_size
+        player.chips, player.bet_amount, player.status, player.has_acted = chips, bet_amount, status, bool(has_acted)
+        player.hand = [first, second][:hand_size]
+        game.players.append(player)
+    waiting = []
+    for _ in range(waiting_count):
+        (name_size,) = NAME.unpack_from(body, offset)
+        offset += NAME.size
+        waiting.append(body[offset:offset + name_size].decode("utf-8"))
+        offset += name_size
+    if extras_size:
+        game.all_in_equity, game.showdown_pots = json.loads(body[offset:offset + extras_size])
+    game._reseat()  # pylint: disable=protected-access
+    game.recount()
+    return game, waiting
+
+
+class LazyGames(dict):
+    """Tables by id where restored tables stay as snapshot bytes until first looked up.
+
+    Membership, ordering and the id list never decode anything, so a lobby
+    with thousands of restored tables is usable immediately and only pays
+    for the tables players actually come back to.
+    """
+
+    def __init__(self, decode):
+        super().__init__()
+        self.decode = decode  # decode(game_id, body) -> PokerGame
+
+    def __getitem__(self, game_id):
+        game = super().__getitem__(game_id)
+        if type(game) is bytes:  # pylint: disable=unidiomatic-typecheck
+            game = self.decode(game_id, game)
+            super().__setitem__(game_id, game)
+        return game
+
+    def get(self, game_id, default=None):
+        return self[game_id] if game_id in self else default
+
+    def values(self):
+        return [self[game_id] for game_id in self]
+
+    def items(self):
+        return [(game_id, self[game_id]) for game_id in self]
+
+    def raw(self, game_id):
+        """The table, or its snapshot bytes if it has not been looked up since the restore."""
+        return super().__getitem__(game_id)
+
+
+class SnapshotStore:
+    """Append-only snapshot log of a Lobby's tables.
+
+    Each write appends only the tables the lobby marked as changed since the
+    previous one (and deletions), so a periodic snapshot costs time in
+    proportion to table activity rather than table count. The latest entry
+    for a table wins on restore. Once the log grows past compact_ratio times
+    the size of its live entries it is rewritten with just those entries.
+    """
+
+    def __init__(self, path, compact_ratio=4):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.live = {}  # key -> size of its latest entry in the log
+
+    def _entry(self, key, body):
+        key = key.encode("utf-8")
+        return ENTRY.pack(len(key), len(body)) + key + body
+
+    def _body(self, lobby, game_id):
+        game = lobby.games.raw(game_id) if isinstance(lobby.games, LazyGames) else lobby.games[game_id]
+        if type(game) is bytes:  # pylint: disable=unidiomatic-typecheck
+            return game  # Restored and never touched since: the snapshot bytes are still current
+        return encode_table(game, lobby.waiting_players.get(game_id, ()))
+
+    def write(self, lobby):
+        """Append the tables changed since the last write; returns how many were written."""
+        if not lobby.changed:
+            return 0
+        changed = list(lobby.changed)
+        lobby.changed.clear()
+        entries = []
+        for key in [""] + changed:
+            if not key:
+                body = LOBBY.pack(lobby.last_game_number)
+            else:
+                body = self._body(lobby, key) if key in lobby.games else b""
+            entry = self._entry(key, body)
+            entries.append(entry)
+            if body:
+                self.live[key] = len(entry)
+            else:
+                self.live.pop(key, None)
+        with open(self.path, "ab") as handle:
+            handle.write(b"".join(entries))
+            handle.flush()
+            os.fsync(handle.fileno())
+        if os.path.getsize(self.path) > self.compact_ratio * max(sum(self.live.values()), 1 << 16):
+            self.compact(lobby)
+        return len(changed)
+
+    def close(self, lobby):
+        """Take the last snapshot and stop tracking changes, so nothing after it is saved."""
+        written = self.write(lobby)
+        lobby.changed = None
+        return written
+
+    def compact(self, lobby):
+        """Rewrite the log with one entry per live table."""
+        temporary = f"{self.path}.tmp"
+        lobby.changed.clear()
+        self.live = {}
+        with open(temporary, "wb") as handle:
+            for key in [""] + list(lobby.games):
+                entry = self._entry(key, self._body(lobby, key) if key else LOBBY.pack(lobby.last_game_number))
+                self.live[key] = len(entry)
+                handle.write(entry)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, self.path)
+
+    def restore(self, lobby):
+        """Load the log into lobby, leaving every table as bytes until it is first looked up.
+
+        Only entry headers are walked here; the tables are decoded by the
+        LazyGames that replaces lobby.games. Call this before serving, even
+        with no log yet, since it also turns on change tracking in the lobby.
+        Returns the number of tables restored.
+        """
+        lobby.changed = set()  # Start tracking changes for the next write
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "rb") as handle:
+            data = handle.read()
+        latest = {}
+        offset = 0
+        while offset + ENTRY.size <= len(data):
+            key_size, body_size = ENTRY.unpack_from(data, offset)
+            start = offset + ENTRY.size
+            end = start + key_size + body_size
+            if end > len(data):
+                break
+            key = data[start:start + key_size].decode("utf-8")
+            latest[key] = (start + key_size, end)
+            self.live[key] = end - offset
+            offset = end
+        if offset < len(data):
+            os.truncate(self.path, offset)  # Drop a torn final write so later entries follow whole ones
+
+        def decode(game_id, body):
+            game, waiting = decode_table(body, game_id, lobby.history)
+            if waiting:
+                lobby.waiting_players[game_id] = waiting
+            return game
+
+        games = LazyGames(decode)
+        for key in sorted(latest, key=lambda x: int(x.split("-")[-1]) if x else 0):  # Creation order
+            start, end = latest[key]
+            if not key:
+                (lobby.last_game_number,) = LOBBY.unpack_from(data, start)
+            elif end > start:
+                games[key] = data[start:end]
+            else:
+                del self.live[key]
+        lobby.games = games
+        return len(games)
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from poker.history import (ACTION, AWARD, BLIND, CALL, FOLD, HAND_END, HAND_START, HOLE, LEAVE, RAISE, RECORD,
+                           SEAT, read_records, segment_paths)
+
+COUNTERS = ("hands", "vpip", "pfr", "aggressive", "calls", "showdowns", "showdown_wins", "profit")
+
+
+def hands_from(path, start=0):
+    """Yield (records of one finished hand, record index just past it) from a segment.
+
+    Hands that never finished (a table deleted mid-hand) are dropped, and a
+    hand still being written at the end of the segment is left for later.
+    """
+    hand = []
+    for index, record in enumerate(read_records(path, start), start + 1):
+        if hand and record.hand != hand[0].hand:
+            hand = []
+        hand.append(record)
+        if record.kind == HAND_END:
+            yield hand, index
+            hand = []
+
+
+def positions(dealer, blinds, seats):
+    """Position name of each seat index at the start of a hand."""
+    names = {dealer: "BTN"}
+    names.update(zip(blinds, ("SB", "BB")))  # Heads-up the button posts the big blind
+    rest = [(blinds[-1] + offset) % seats for offset in range(1, seats)]
+    rest = [seat for seat in rest if seat not in names]
+    names.update(zip(rest, ("UTG", "MP", "CO")[-len(rest):] if rest else ()))
+    return names
+
+
+def player_lines(hands):
+    """Turn hands into one (name, position, counters) line per player dealt in.
+
+    counters follows COUNTERS: 1 for the hand, flags for VPIP (called or raised
+    preflop), PFR (raised preflop) and showdown reached / won, postflop
+    aggressive and calling action counts for the aggression factor, and the
+    chips won less the chips put in.
+    """
+    for hand in hands:
+        seated, dealer, blinds = [], 0, []
+        lines, starting = {}, {}
+        live, awarded = set(), set()
+        for record in hand:
+            kind = record.kind
+            if kind == HAND_START:
+                dealer = record.seat
+            elif kind == SEAT:
+                seated.append(record.text)
+            elif kind == LEAVE:
+                live.discard(seated.pop(record.seat))
+            elif kind == HOLE:
+                if not starting:
+                    names = positions(dealer, blinds, len(seated))
+                    starting = {name: names.get(seat) for seat, name in enumerate(seated)}
+                name = seated[record.seat]
+                lines.setdefault(name, [1, 0, 0, 0, 0, 0, 0, 0])
+                live.add(name)
+            elif kind == ACTION:
+                name = seated[record.seat]
+                if record.action == BLIND:
+                    blinds.append(record.seat)
+                    lines.setdefault(name, [1, 0, 0, 0, 0, 0, 0, 0])[7] -= record.value
+                    continue
+                line = lines[name]
+                line[7] -= record.value
+                if record.action == FOLD:
+                    live.discard(name)
+                elif record.round == 0:
+                    if record.value:
+                        line[1] = 1
+                    if record.action == RAISE and record.value:
+                        line[2] = 1
+                elif record.action == RAISE and record.value:
+                    line[3] += 1
+                elif record.action == CALL and record.value:
+                    line[4] += 1
+            elif kind == AWARD:
+                name = seated[record.seat]
+                lines[name][7] += record.amount
+                awarded.add(name)
+        for name, line in lines.items():
+            if len(live) > 1 and name in live:
+                line[5] = 1
+                line[6] = int(name in awarded)
+            yield name, starting.get(name), line
+
+
+def accumulate(lines, totals=None):
+    """Fold player lines into totals: name -> {counter: value, "positions": {position: [hands, profit]}}."""
+    totals = {} if totals is None else totals
+    for name, position, line in lines:
+        player = totals.get(name)
+        if player is None:
+            player = totals[name] = dict.fromkeys(COUNTERS, 0)
+            player["positions"] = {}
+        for counter, value in zip(COUNTERS, line):
+            player[counter] += value
+        if position:
+            seat = player["positions"].setdefault(position, [0, 0])
+            seat[0] += 1
+            seat[1] += line[7]
+    return totals
+
+
+def merge(totals, other):
+    """Add one set of totals into another."""
+    for name, player in other.items():
+        mine = totals.get(name)
+        if mine is None:
+            totals[name] = player
+            continue
+        for counter in COUNTERS:
+            mine[counter] += player[counter]
+        for position, (hands, profit) in player["positions"].items():
+            seat = mine["positions"].setdefault(position, [0, 0])
+            seat[0] += hands
+            seat[1] += profit
+    return totals
+
+
+def segment_totals(path, start=0):
+    """Totals of one segment from record index start; returns (totals, index to resume from)."""
+    end = start
+
+    def hands():
+        nonlocal end
+        for hand, end in hands_from(path, start):
+            yield hand
+    totals = accumulate(player_lines(hands()))
+    return totals, end
+
+
+def summary(player):
+    """Rates for one player's totals, as percentages except the aggression factor."""
+    hands = player["hands"] or 1
+    return {
+        "hands": player["hands"],
+        "vpip": 100 * player["vpip"] / hands,
+        "pfr": 100 * player["pfr"] / hands,
+        "af": player["aggressive"] / player["calls"] if player["calls"] else float(player["aggressive"]),
+        "wsd": 100 * player["showdown_wins"] / player["showdowns"] if player["showdowns"] else 0.0,
+        "profit": player["profit"],
+        "positions": {position: {"hands": hands, "profit": profit, "per_hand": profit / hands}
+                      for position, (hands, profit) in player["positions"].items()},
+    }
+
+
+def load(state_path):
+    if state_path and os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as handle:
+            return json.load(handle)
+    return {"segments": {}, "players": {}}
+
+
+def save(state, state_path):
+    """Write the aggregates atomically, so an interrupted update keeps the previous ones."""
+    temporary = f"{state_path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump(state, handle)
+    os.replace(temporary, state_path)
+
+
+def update(directory, state_path=None, prefix="", workers=None):
+    """Fold hands recorded since the last update into the persisted aggregates and return them.
+
+    The state remembers how many records of each segment were already
+    counted, so only new segments and the new tail of a growing one are
+    read. Segments are processed in parallel, each in constant memory.
+    """
+    state = load(state_path)
+    done = state["segments"]
+    jobs = [(path, done.get(os.path.basename(path), 0)) for path in segment_paths(directory, prefix)]
+    jobs = [(path, start) for path, start in jobs if os.path.getsize(path) // RECORD.size > start]
+    if workers == 1 or len(jobs) < 2:
+        results = [segment_totals(path, start) for path, start in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(segment_totals, *zip(*jobs)))
+    for (path, _), (totals, end) in zip(jobs, results):
+        merge(state["players"], totals)
+        done[os.path.basename(path)] = end
+    if state_path:
+        save(state, state_path)
+    return state["players"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Player statistics over recorded hand histories.")
+    parser.add_argument("directory", help="hand-history directory")
+    parser.add_argument("--state", help="aggregates file; only hands recorded since its last update are read")
+    parser.add_argument("--prefix", default="", help="only segments whose file name starts with this")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    players = update(args.directory, args.state, args.prefix, args.workers)
+    for name, player in sorted(players.items(), key=lambda item: -item[1]["profit"]):
+        rates = summary(player)
+        print(f"📊 {name}: {rates['hands']} hands, VPIP {rates['vpip']:.1f}%, PFR {rates['pfr']:.1f}%, "
+              f"AF {rates['af']:.2f}, W$SD {rates['wsd']:.1f}%, {rates['profit']:+d} chips")
+        for position, seat in sorted(rates["positions"].items()):
+            print(f"  {position}: {seat['hands']} hands, {seat['profit']:+d} chips ({seat['per_hand']:+.2f}/hand)")
+
+
+if __name__ == "__main__":
+    main()
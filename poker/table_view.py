@@ -0,0 +1,41 @@
+from array import array
+
+import numpy as np
+
+from poker.player import FOLDED
+
+
+class TableView:
+    """Struct-of-arrays snapshot of a table's seats: one typed column per field.
+
+    Columns are compact array('q'/'b') buffers in seat order, about 17 bytes a
+    seat instead of a Player object each, and as_numpy() exposes them to NumPy
+    without copying. The view does not follow later changes to the game.
+    """
+
+    __slots__ = ("names", "chips", "bets", "status")
+
+    def __init__(self, game):
+        players = game.players
+        self.names = tuple(p.name for p in players)
+        self.chips = array('q', [p.chips for p in players])
+        self.bets = array('q', [p.bet_amount for p in players])
+        self.status = array('b', [p.status for p in players])
+
+    def __len__(self):
+        return len(self.names)
+
+    def as_numpy(self):
+        """Zero-copy NumPy views of the chips, bets and status columns."""
+        return (
+            np.frombuffer(self.chips, dtype=np.int64),
+            np.frombuffer(self.bets, dtype=np.int64),
+            np.frombuffer(self.status, dtype=np.int8),
+        )
+
+    def call_amounts(self):
+        """Chips each seat needs to match the highest live bet, as an int64 array."""
+        _, bets, status = self.as_numpy()
+        live = status != FOLDED
+        highest = bets[live].max() if live.any() else 0
+        return np.maximum(highest - bets, 0)
@@ -0,0 +1,63 @@
+import heapq
+import threading
+import time
+from itertools import count
+
+
+class TurnClock:
+    """Turn deadlines of every table in one heap, driven by a single scheduler loop.
+
+    schedule() pushes a new deadline and supersedes the table's previous one,
+    cancel() forgets it; both are O(log n) at most, since superseded entries
+    are skipped when they reach the top of the heap instead of being searched
+    for. The heap is rebuilt once they outnumber the live deadlines. A token
+    describes whose turn the deadline is for, so the clock is only restarted
+    when the turn actually moved. The lock lets threaded servers schedule
+    from their handler threads while the scheduler pops expired deadlines.
+    """
+
+    def __init__(self, timeout=30.0, clock=time.monotonic):
+        self.timeout = timeout
+        self.clock = clock
+        self.heap = []  # (deadline, sequence, game_id), including superseded entries
+        self.pending = {}  # game_id -> (sequence, token) of its live deadline
+        self.sequence = count()
+        self.lock = threading.Lock()
+
+    def schedule(self, game_id, token, timeout=None):
+        """Start game_id's clock for token unless it is already running for it; returns whether it restarted."""
+        with self.lock:
+            current = self.pending.get(game_id)
+            if current and current[1] == token:
+                return False
+            sequence = next(self.sequence)
+            self.pending[game_id] = (sequence, token)
+            heapq.heappush(self.heap, (self.clock() + (timeout or self.timeout), sequence, game_id))
+            if len(self.heap) > 2 * len(self.pending) + 64:
+                self.heap = [entry for entry in self.heap if self.pending.get(entry[2], (None,))[0] == entry[1]]
+                heapq.heapify(self.heap)
+            return True
+
+    def cancel(self, game_id):
+        with self.lock:
+            self.pending.pop(game_id, None)
+
+    def expired(self, now=None):
+        """Pop every deadline that has passed; returns their (game_id, token) pairs."""
+        now = self.clock() if now is None else now
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                _, sequence, game_id = heapq.heappop(self.heap)
+                entry = self.pending.get(game_id)
+                if entry and entry[0] == sequence:
+                    del self.pending[game_id]
+                    due.append((game_id, entry[1]))
+        return due
+
+    def wait(self, resolution=0.5):
+        """Seconds the scheduler can sleep before the next deadline, at most resolution."""
+        with self.lock:
+            if not self.heap:
+                return resolution
+            return min(max(self.heap[0][0] - self.clock(), 0.0), resolution)
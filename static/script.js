@@ -1,6 +1,9 @@
-var socket = io.connect("http://localhost:5000");
+var socket = io();  // Same origin as the page, which may be one worker of a sharded server
 var currentGameId = null;
 var playerName = null;
+var tableState = null;       // Last full table state, kept current by patches
+var stateVersion = null;     // Version of tableState
+var awaitingResync = false;  // A full snapshot has been requested
 
 // 🔄 Request available games on load
 socket.emit("get_games");
@@ -12,7 +15,8 @@ socket.on("update_games", function(gameList) {
 
     gameList.forEach(game => {
         let gameItem = document.createElement("li");
-        gameItem.innerHTML = `${game} <button onclick="joinGame('${game}')">Join</button>`;
+        gameItem.innerHTML = `${game} <button onclick="joinGame('${game}')">Join</button>` +
+            ` <button onclick="watchGame('${game}')">Watch</button>`;
         gameListContainer.appendChild(gameItem);
     });
 });
@@ -23,22 +27,97 @@ function createGame() {
 }
 
 // 🔄 Join an existing game
-function joinGame(gameId) {
-    playerName = prompt("Enter your name:");
+function joinGame(gameId, name) {
+    playerName = name || prompt("Enter your name:");
     if (!playerName) return;
 
     currentGameId = gameId;
+    tableState = null;
+    stateVersion = null;
 
     document.getElementById("player-name").innerText = playerName;
     document.getElementById("game-selection").style.display = "none";
     document.getElementById("game-container").style.display = "block";
+    document.getElementById("actions").style.display = "block";
     document.getElementById("game-title").innerHTML = `Game ID: ${gameId}`;
 
     socket.emit("join_game", { game_id: gameId, name: playerName });
 }
 
-// 🃏 Game State Updates
+// 👀 Watch a table without a seat; spectators get updates less often than players
+function watchGame(gameId) {
+    playerName = null;
+    currentGameId = gameId;
+    tableState = null;
+    stateVersion = null;
+
+    document.getElementById("game-selection").style.display = "none";
+    document.getElementById("game-container").style.display = "block";
+    document.getElementById("actions").style.display = "none";
+    document.getElementById("game-title").innerHTML = `Watching ${gameId}`;
+
+    socket.emit("watch_game", { game_id: gameId });
+}
+
+// 🔀 Sharded servers send players to the worker that owns the table
+socket.on("route", function(data) {
+    const params = new URLSearchParams(data.watch ? { game_id: data.game_id, watch: 1 }
+                                                  : { game_id: data.game_id, name: playerName });
+    window.location.href = `${data.url}/?${params}`;
+});
+
+// 🔌 Back after a dropped connection or a server restart: take the same seat again
+socket.io.on("reconnect", function() {
+    if (currentGameId && playerName) {
+        socket.emit("join_game", { game_id: currentGameId, name: playerName });
+    } else if (currentGameId) {
+        socket.emit("watch_game", { game_id: currentGameId });
+    }
+});
+
+// 🔀 Arriving from a route: join the table right away
+const joinParams = new URLSearchParams(window.location.search);
+if (joinParams.get("game_id") && joinParams.get("name")) {
+    joinGame(joinParams.get("game_id"), joinParams.get("name"));
+} else if (joinParams.get("game_id") && joinParams.get("watch")) {
+    watchGame(joinParams.get("game_id"));
+}
+
+// 🃏 Full game state snapshot (on join, or after asking for a resync)
 socket.on("game_state", function(data) {
+    tableState = data;
+    stateVersion = data.version;
+    awaitingResync = false;
+    renderState(tableState);
+});
+
+// 🔄 Versioned state patches: apply them in order, ask for a full snapshot on a gap
+socket.on("game_state_patch", function(patch) {
+    if (awaitingResync || (stateVersion !== null && patch.version <= stateVersion)) return;
+    if (tableState === null || patch.base !== stateVersion) {
+        awaitingResync = true;
+        socket.emit("request_state", { game_id: currentGameId });
+        return;
+    }
+    Object.assign(tableState, patch.set ?? {});
+    if (patch.board_append) {
+        tableState.community_cards = tableState.community_cards.concat(patch.board_append);
+    }
+    if (Array.isArray(patch.players)) {
+        tableState.players = patch.players;
+    } else if (patch.players) {
+        for (const [index, fields] of Object.entries(patch.players)) {
+            Object.assign(tableState.players[index], fields);
+        }
+    }
+    stateVersion = patch.version;
+    renderState(tableState);
+});
+
+// 🃏 Game State Updates
+function renderState(data) {
+    if (!data || !Array.isArray(data.players)) return; // 🚫 Nothing published for this table yet
+
     // 🎭 Update turn and bet status
     document.getElementById("game-status").innerHTML = `💰 Pot: ${data.pot ?? 0}`;
     document.getElementById("turn-indicator").innerHTML = `🎭 Current Turn: ${data.current_player ?? "Waiting..."}`;
@@ -56,17 +135,10 @@ socket.on("game_state", function(data) {
         });
     }
 
-    // 🃏 Update player hand
-    let playerHandContainer = document.getElementById("player-hand");
-    playerHandContainer.innerHTML = "<h3>Your Hand</h3>";
+    // 🃏 Update player hand (the table broadcast only carries hands when they are public)
     let currentPlayerData = data.players?.find(p => p.name === playerName);
     if (currentPlayerData?.hand?.length > 0) {
-        currentPlayerData.hand.forEach(card => {
-            let cardDiv = document.createElement("div");
-            cardDiv.className = "card";
-            cardDiv.innerHTML = `${card.rank} of ${card.suit}`;
-            playerHandContainer.appendChild(cardDiv);
-        });
+        renderHand(currentPlayerData.hand, currentPlayerData.preflop_equity);
     }
 
     // 🔄 Restore player balances
@@ -75,7 +147,9 @@ socket.on("game_state", function(data) {
     data.players.forEach(player => {
         let playerDiv = document.createElement("div");
         playerDiv.className = "player-info";
-        playerDiv.innerHTML = `<strong>${player.name}</strong> - 🪙 Chips: ${player.chips} - ${player.status}`;
+        let equity = data.all_in_equity?.[player.name];
+        let equityText = equity ? ` - 📊 All-in equity: ${(equity.equity * 100).toFixed(1)}%` : "";
+        playerDiv.innerHTML = `<strong>${player.name}</strong> - 🪙 Chips: ${player.chips} - ${player.status}${equityText}`;
         playersContainer.appendChild(playerDiv);
     });
 
@@ -102,8 +176,30 @@ socket.on("game_state", function(data) {
         message.innerHTML = `🏆 <b>${data.winner}</b> wins the pot of <b>${data.pot}</b> chips!`;
         modal.style.display = "flex";
     }
+}
+
+// 🃏 Private hole cards, sent only to this player's connection
+socket.on("player_hand", function(data) {
+    renderHand(data.hand ?? [], data.preflop_equity);
 });
 
+function renderHand(hand, preflopEquity) {
+    let playerHandContainer = document.getElementById("player-hand");
+    playerHandContainer.innerHTML = "<h3>Your Hand</h3>";
+    hand.forEach(card => {
+        let cardDiv = document.createElement("div");
+        cardDiv.className = "card";
+        cardDiv.innerHTML = `${card.rank} of ${card.suit}`;
+        playerHandContainer.appendChild(cardDiv);
+    });
+    // 📊 All-in equity against the other players' random hands, when the server has the table
+    if (preflopEquity != null) {
+        let hint = document.createElement("p");
+        hint.innerText = `Preflop equity: ${(preflopEquity * 100).toFixed(1)}%`;
+        playerHandContainer.appendChild(hint);
+    }
+}
+
 socket.on("game_deleted", function(data) {
     if (currentGameId === data.game_id) {
         document.getElementById("game-container").style.display = "none";
@@ -126,10 +222,27 @@ socket.on("game_deleted", function(data) {
 
 // 🏆 Winner Announcement & Auto-Restart Game
 socket.on("game_result", function(data) {
-    socket.emit("start_new_game");
+    socket.emit("start_new_game", { game_id: currentGameId });
+    showResult(data);
+});
+
+// 📊 An all-in hand was run out; the server has already dealt the next one
+socket.on("all_in_result", function(data) {
+    showResult(data);
+});
 
+function showResult(data) {
     let alertBox = document.createElement("div");
     alertBox.innerHTML = `🏆 Winner: ${data.winner} | 💰 Pot: ${data.pot}`;
+    if (data.pots?.length > 1) {
+        data.pots.forEach((pot, i) => {
+            let label = i === 0 ? "Main pot" : `Side pot ${i}`;
+            alertBox.innerHTML += `<br>${label} (${pot.amount}): ${pot.winners.join(", ")} with ${pot.hand}`;
+        });
+    }
+    for (const [name, odds] of Object.entries(data.equity ?? {})) {
+        alertBox.innerHTML += `<br>📊 ${name}: ${(odds.equity * 100).toFixed(1)}% all-in equity`;
+    }
     alertBox.className = "alert-box";
     document.body.appendChild(alertBox);
 
@@ -138,7 +251,7 @@ socket.on("game_result", function(data) {
         alertBox.style.opacity = 0;
         setTimeout(() => alertBox.remove(), 500);
     }, 5000);
-});
+}
 
 // 🔄 Betting Functions
 function placeBet() {
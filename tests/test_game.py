@@ -0,0 +1,34 @@
+import random
+
+from poker.game import PokerGame
+from poker.player import FOLDED
+
+
+def _heads_up_hand():
+    game = PokerGame(rng=random.Random(1), compute_equity=False, debug=True)
+    game.add_player("A")
+    game.add_player("B")
+    game.start_game()
+    return game
+
+
+def test_mid_hand_join_keeps_the_hand_going():
+    game = _heads_up_hand()
+    game.add_player("C")
+    game.deal_hole_cards(game.get_player("C"))
+    assert game.live_count == 3
+    assert game.get_player("C") in game.to_act
+
+    folder = game.get_current_player().name
+    assert game.process_action(folder, "fold") is None  # Two players are still live, so no winner yet
+    assert game.get_player(folder).status == FOLDED
+    assert game.live_count == 2
+    assert game.current_round == 0
+
+
+def test_mid_hand_join_then_call():
+    game = _heads_up_hand()
+    game.add_player("C")
+    game.deal_hole_cards(game.get_player("C"))
+    game.process_action(game.get_current_player().name, "call")  # debug=True cross-checks the cached state
+    assert game.live_count == 3
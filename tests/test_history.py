@@ -0,0 +1,46 @@
+import os
+import random
+
+from poker.game import PokerGame
+from poker.history import RECORD, HandHistoryWriter, read_hands, segment_paths
+
+
+def _play(writer, tables, hands):
+    games = []
+    for index in range(tables):
+        game = PokerGame(rng=random.Random(index), compute_equity=False, game_id=f"game-{index}", history=writer)
+        game.add_player("A")
+        game.add_player("B")
+        game.start_game()
+        games.append(game)
+    for _ in range(hands):
+        for game in games:
+            game.process_action(game.get_current_player().name, "fold")  # Ends the hand, the next one starts
+
+
+def test_hand_ids_continue_after_restart(tmp_path):
+    writer = HandHistoryWriter(str(tmp_path))
+    _play(writer, tables=50, hands=3)
+    writer.close()
+    ids = [hand[0].hand for hand in read_hands(segment_paths(str(tmp_path)))]
+    assert ids == list(range(1, len(ids) + 1))
+
+    writer = HandHistoryWriter(str(tmp_path))
+    assert writer.last_hand == len(ids)
+    writer.close()
+
+
+def test_torn_record_is_cut_off(tmp_path):
+    writer = HandHistoryWriter(str(tmp_path))
+    _play(writer, tables=1, hands=2)
+    writer.close()
+    path = segment_paths(str(tmp_path))[-1]
+    with open(path, "ab") as handle:
+        handle.write(b"\x01" * (RECORD.size // 2))  # A crash in the middle of a record
+
+    writer = HandHistoryWriter(str(tmp_path))
+    _play(writer, tables=1, hands=1)
+    writer.close()
+    assert os.path.getsize(path) % RECORD.size == 0
+    hands = list(read_hands(segment_paths(str(tmp_path))))
+    assert [hand[0].hand for hand in hands] == list(range(1, len(hands) + 1))
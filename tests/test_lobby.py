@@ -0,0 +1,66 @@
+from poker.lobby import Lobby
+
+
+def _table_on_the_flop():
+    lobby = Lobby()
+    lobby.create_game("sid-A")
+    for sid, name in (("sid-A", "alice"), ("sid-B", "bob")):
+        lobby.connect(sid)
+        lobby.join_game(sid, {"game_id": "game-1", "name": name})
+    game = lobby.games["game-1"]
+    while game.current_round == 0:
+        player = game.get_current_player()
+        lobby.player_action(None, {"game_id": "game-1", "name": player.name, "action": "call"})
+    return lobby
+
+
+def _hands_sent(out):
+    return {to for kind, event, _, to in (op for op in out if op[0] == "emit") if event == "player_hand"}
+
+
+def test_queued_player_gets_their_cards_on_the_next_hand():
+    lobby = _table_on_the_flop()
+    lobby.connect("sid-C")
+    out = lobby.join_game("sid-C", {"game_id": "game-1", "name": "carol"})
+    assert any(op[1] == "join_error" for op in out)
+    assert lobby.waiting_players["game-1"] == ["carol"]
+
+    out = lobby.start_new_game("sid-A", {"game_id": "game-1"})
+    assert "sid-C" in _hands_sent(out)
+    assert lobby.games["game-1"].get_player("carol").hand
+
+
+def test_queued_player_disconnect_leaves_the_queue():
+    lobby = _table_on_the_flop()
+    lobby.connect("sid-C")
+    lobby.join_game("sid-C", {"game_id": "game-1", "name": "carol"})
+    lobby.disconnect("sid-C")
+    lobby.start_new_game("sid-A", {"game_id": "game-1"})
+    assert lobby.games["game-1"].get_player("carol") is None
+
+
+def test_queued_name_cannot_be_taken():
+    lobby = _table_on_the_flop()
+    lobby.connect("sid-C")
+    lobby.join_game("sid-C", {"game_id": "game-1", "name": "carol"})
+    lobby.connect("sid-X")
+    out = lobby.join_game("sid-X", {"game_id": "game-1", "name": "carol"})
+    assert [op[1] for op in out if op[0] == "emit"] == ["join_error"]
+    assert lobby.sessions.sid_for("game-1", "carol") == "sid-C"
+
+
+def test_all_in_runout_is_announced_before_the_next_hand():
+    lobby = Lobby()
+    lobby.create_game("sid-A")
+    for sid, name in (("sid-A", "alice"), ("sid-B", "bob")):
+        lobby.connect(sid)
+        lobby.join_game(sid, {"game_id": "game-1", "name": name})
+    game = lobby.games["game-1"]
+    out = []
+    for _ in range(2):
+        player = game.get_current_player()
+        out += lobby.player_action(None, {"game_id": "game-1", "name": player.name, "action": "raise", "amount": 5000})
+    results = [op[2] for op in out if op[0] == "emit" and op[1] == "all_in_result"]
+    assert len(results) == 1
+    assert set(results[0]["equity"]) == {"alice", "bob"}
+    assert game.all_in_equity is None  # The next hand's state doesn't carry the last runout's equities
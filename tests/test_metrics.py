@@ -0,0 +1,19 @@
+import threading
+
+from poker.metrics import Histogram
+
+
+def test_concurrent_observations_are_all_counted():
+    histogram = Histogram()
+
+    def observe():
+        for _ in range(20000):
+            histogram.observe(0.001)
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counts, _, observed = histogram.snapshot()
+    assert observed == sum(counts) == 80000
@@ -0,0 +1,8 @@
+from poker.simulator import STRATEGIES, simulate
+
+
+def test_self_play_conserves_chips_with_debug_checks():
+    seats = [(f"{name}-{i}", STRATEGIES[name]) for i, name in enumerate(["tag", "random", "call", "random"])]
+    stats = simulate(seats, hands=500, tables=2, workers=1, seed=7, debug=True)
+    assert stats["hands"] == 1000
+    assert sum(stats["net"].values()) == 0